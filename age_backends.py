@@ -0,0 +1,157 @@
+import os
+import logging
+import numpy as np
+
+
+KERAS_MODEL_FILENAME = "age_model.h5"
+TFLITE_MODEL_FILENAME = "age_model.tflite"
+ONNX_MODEL_FILENAME = "age_model.onnx"
+BACKEND_NAMES = ("auto", "tflite", "onnx", "keras")
+
+
+class KerasAgeBackend:
+    """Runs the original Keras model; heaviest, but always available when TensorFlow is installed."""
+
+    name = "keras"
+
+    def __init__(self, model_path, num_threads=None):
+        os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+        os.environ['KMP_DUPLICATE_LIB_OK'] = 'True'
+        import tensorflow as tf
+        if num_threads:
+            try:
+                tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+            except RuntimeError:
+                # Threading can only be configured before TensorFlow initialises
+                logging.debug("TensorFlow already initialised; keeping its thread settings.")
+        self.model = tf.keras.models.load_model(model_path, compile=False)
+        self.model_path = model_path
+
+    def predict(self, batch):
+        return np.asarray(self.model.predict(batch, batch_size=len(batch), verbose=0))[:, 0]
+
+
+class TFLiteAgeBackend:
+    """Runs a converted .tflite model through the lightweight TFLite interpreter."""
+
+    name = "tflite"
+
+    def __init__(self, model_path, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.model_path = model_path
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input["shape"][0])
+
+    def _resize(self, batch_size):
+        if batch_size != self._batch_size:
+            self.interpreter.resize_tensor_input(self._input["index"], [batch_size, 224, 224, 3])
+            self.interpreter.allocate_tensors()
+            self._input = self.interpreter.get_input_details()[0]
+            self._output = self.interpreter.get_output_details()[0]
+            self._batch_size = batch_size
+
+    def predict(self, batch):
+        self._resize(len(batch))
+        input_dtype = self._input["dtype"]
+        if input_dtype != np.float32:
+            # Fully integer-quantized models take quantized inputs
+            scale, zero_point = self._input["quantization"]
+            batch = np.round(batch / scale + zero_point)
+            info = np.iinfo(input_dtype)
+            batch = np.clip(batch, info.min, info.max)
+        self.interpreter.set_tensor(self._input["index"], batch.astype(input_dtype))
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self._output["index"]).astype(np.float32)
+        scale, zero_point = self._output["quantization"]
+        if scale:
+            output = (output - zero_point) * scale
+        return output[:, 0]
+
+
+class OnnxAgeBackend:
+    """Runs a converted .onnx model through ONNX Runtime on the CPU."""
+
+    name = "onnx"
+
+    def __init__(self, model_path, num_threads=None):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(model_path, sess_options=options,
+                                                    providers=["CPUExecutionProvider"])
+        self.model_path = model_path
+        self._input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch):
+        return np.asarray(self.session.run(None, {self._input_name: batch.astype(np.float32)})[0])[:, 0]
+
+
+_BACKENDS = {
+    "tflite": (TFLiteAgeBackend, TFLITE_MODEL_FILENAME),
+    "onnx": (OnnxAgeBackend, ONNX_MODEL_FILENAME),
+    "keras": (KerasAgeBackend, KERAS_MODEL_FILENAME),
+}
+
+
+def create_age_backend(models_dir, backend="auto", num_threads=None):
+    """Open the age model with the requested backend.
+
+    "auto" prefers a converted TFLite model, then ONNX, and falls back to the
+    Keras .h5 model when no converted file exists or its runtime is missing.
+    """
+    if backend not in BACKEND_NAMES:
+        raise ValueError(f"Unknown age backend '{backend}', expected one of {BACKEND_NAMES}")
+    candidates = ["tflite", "onnx", "keras"] if backend == "auto" else [backend]
+    last_error = None
+    for name in candidates:
+        backend_cls, filename = _BACKENDS[name]
+        model_path = os.path.join(models_dir, filename)
+        if not os.path.exists(model_path):
+            last_error = FileNotFoundError(model_path)
+            continue
+        try:
+            return backend_cls(model_path, num_threads=num_threads)
+        except ImportError as e:
+            logging.info(f"Age backend '{name}' unavailable: {e}")
+            last_error = e
+    raise last_error or FileNotFoundError(os.path.join(models_dir, KERAS_MODEL_FILENAME))
+
+
+def convert_age_model(models_dir, fmt="tflite", quantize=False):
+    """Convert age_model.h5 once into a .tflite (optionally dynamic-range int8) or .onnx file."""
+    import tensorflow as tf
+    model = tf.keras.models.load_model(os.path.join(models_dir, KERAS_MODEL_FILENAME), compile=False)
+    if fmt == "tflite":
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        if quantize:
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        output_path = os.path.join(models_dir, TFLITE_MODEL_FILENAME)
+        with open(output_path, "wb") as f:
+            f.write(converter.convert())
+    elif fmt == "onnx":
+        import tf2onnx
+        output_path = os.path.join(models_dir, ONNX_MODEL_FILENAME)
+        spec = (tf.TensorSpec((None, 224, 224, 3), tf.float32, name="input"),)
+        tf2onnx.convert.from_keras(model, input_signature=spec, opset=13, output_path=output_path)
+    else:
+        raise ValueError(f"Unsupported conversion format '{fmt}'")
+    return output_path
+
+
+if __name__ == "__main__":
+    import argparse
+    BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser = argparse.ArgumentParser(description="Convert the Keras age model for a lighter CPU runtime.")
+    parser.add_argument("models_dir", nargs="?", default=os.path.join(BASE_DIR, 'models'),
+                        help="Directory containing age_model.h5 (default: the project's models/)")
+    parser.add_argument("--format", choices=["tflite", "onnx"], default="tflite")
+    parser.add_argument("--quantize", action="store_true", help="Apply dynamic-range int8 quantization (TFLite only)")
+    args = parser.parse_args()
+    print(f"✅ Wrote {convert_age_model(args.models_dir, args.format, args.quantize)}")
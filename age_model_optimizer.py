@@ -0,0 +1,181 @@
+import os
+import cv2
+import csv
+import json
+import time
+import argparse
+import numpy as np
+from . import age_backends
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MODELS_DIR = os.path.join(BASE_DIR, 'models')
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+OUTPUT_DIRNAME = "optimized"
+VARIANTS = ("float16", "dynamic_int8", "full_int8")
+
+
+def _load_face(img_path):
+    img = cv2.imread(img_path)
+    if img is None:
+        return None
+    face_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    return cv2.resize(face_rgb, (224, 224)).astype(np.float32) / 255.0
+
+
+def split_dataset(dataset_path, holdout_fraction=0.3, max_calibration=200, seed=0):
+    """Split family_dataset images into disjoint calibration and held-out lists of (person, path)."""
+    samples = []
+    for person in sorted(os.listdir(dataset_path)):
+        person_path = os.path.join(dataset_path, person)
+        if os.path.isdir(person_path):
+            samples.extend((person, os.path.join(person_path, name)) for name in sorted(os.listdir(person_path)))
+    order = np.random.default_rng(seed).permutation(len(samples))
+    n_holdout = max(1, int(len(samples) * holdout_fraction)) if samples else 0
+    holdout = [samples[i] for i in order[:n_holdout]]
+    calibration = [samples[i] for i in order[n_holdout:n_holdout + max_calibration]]
+    return calibration, holdout
+
+
+def load_ages(ages_csv):
+    """Read a `name,age` CSV giving each family member's true age."""
+    ages = {}
+    with open(ages_csv, newline="") as f:
+        for row in csv.reader(f):
+            if len(row) >= 2 and row[1].strip().isdigit():
+                ages[row[0].strip()] = int(row[1])
+    return ages
+
+
+def export_variant(keras_model, variant, output_path, calibration_paths):
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if variant == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == "full_int8":
+        def representative_dataset():
+            for path in calibration_paths:
+                face = _load_face(path)
+                if face is not None:
+                    yield [face[np.newaxis]]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    with open(output_path, "wb") as f:
+        f.write(converter.convert())
+    return output_path
+
+
+def evaluate(backend_cls, model_path, faces, targets, latency_runs=30, num_threads=None):
+    started = time.perf_counter()
+    backend = backend_cls(model_path, num_threads=num_threads)
+    load_seconds = time.perf_counter() - started
+
+    single = faces[:1]
+    backend.predict(single) # Warm-up, excluded from latency
+    latencies = []
+    for _ in range(latency_runs):
+        started = time.perf_counter()
+        backend.predict(single)
+        latencies.append(time.perf_counter() - started)
+
+    predictions = np.concatenate([backend.predict(faces[i:i + 16]) for i in range(0, len(faces), 16)])
+    return {
+        "file_size_mb": os.path.getsize(model_path) / (1024 * 1024),
+        "load_seconds": load_seconds,
+        "latency_ms_p50": 1000.0 * float(np.percentile(latencies, 50)),
+        "latency_ms_p95": 1000.0 * float(np.percentile(latencies, 95)),
+        "mae": float(np.mean(np.abs(predictions - targets))),
+    }, predictions
+
+
+def optimize(models_dir=MODELS_DIR, dataset_path=None, ages_csv=None, variants=VARIANTS, num_threads=None):
+    """Export optimized TFLite variants of age_model.h5 and compare them against the Keras baseline.
+
+    MAE is measured against the true ages from `ages_csv` when given; otherwise
+    against the Keras model's own predictions, i.e. how faithful each variant is.
+    """
+    import tensorflow as tf
+    dataset_path = dataset_path or os.path.join(DATA_DIR, "family_dataset")
+    calibration, holdout = split_dataset(dataset_path)
+    if not holdout:
+        raise ValueError(f"No images found in {dataset_path}")
+
+    true_ages = load_ages(ages_csv) if ages_csv else {}
+    faces, persons = [], []
+    for person, path in holdout:
+        face = _load_face(path)
+        if face is not None and (not true_ages or person in true_ages):
+            faces.append(face)
+            persons.append(person)
+    if not faces:
+        raise ValueError("No usable held-out images (check the ages CSV names match dataset folders).")
+    faces = np.stack(faces)
+
+    keras_path = os.path.join(models_dir, age_backends.KERAS_MODEL_FILENAME)
+    keras_targets = np.zeros(len(faces), dtype=np.float32)
+    if true_ages:
+        keras_targets = np.array([true_ages[person] for person in persons], dtype=np.float32)
+    baseline, baseline_predictions = evaluate(age_backends.KerasAgeBackend, keras_path, faces,
+                                              keras_targets, num_threads=num_threads)
+    targets = keras_targets if true_ages else baseline_predictions
+    if not true_ages:
+        baseline["mae"] = 0.0
+
+    report = {
+        "reference": "true ages" if true_ages else "keras float32 predictions",
+        "holdout_images": len(faces),
+        "calibration_images": len(calibration),
+        "variants": {"keras_float32": dict(baseline, path=keras_path)},
+    }
+
+    output_dir = os.path.join(models_dir, OUTPUT_DIRNAME)
+    os.makedirs(output_dir, exist_ok=True)
+    keras_model = tf.keras.models.load_model(keras_path, compile=False)
+    for variant in variants:
+        output_path = os.path.join(output_dir, f"age_model_{variant}.tflite")
+        print(f"🔹 Exporting {variant}...")
+        try:
+            export_variant(keras_model, variant, output_path, [path for _, path in calibration])
+            metrics, _ = evaluate(age_backends.TFLiteAgeBackend, output_path, faces, targets,
+                                  num_threads=num_threads)
+            report["variants"][variant] = dict(metrics, path=output_path)
+        except Exception as e:
+            print(f"Warning: {variant} export failed: {e}")
+            report["variants"][variant] = {"error": str(e)}
+
+    report_path = os.path.join(output_dir, "report.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    report["report_path"] = report_path
+    return report
+
+
+def format_report(report):
+    lines = [f"MAE reference: {report['reference']} ({report['holdout_images']} held-out images, "
+             f"{report['calibration_images']} calibration images)",
+             f"{'variant':<16}{'size MB':>10}{'load s':>10}{'p50 ms':>10}{'p95 ms':>10}{'MAE':>8}"]
+    for name, metrics in report["variants"].items():
+        if "error" in metrics:
+            lines.append(f"{name:<16}  failed: {metrics['error']}")
+            continue
+        lines.append(f"{name:<16}{metrics['file_size_mb']:>10.2f}{metrics['load_seconds']:>10.2f}"
+                     f"{metrics['latency_ms_p50']:>10.1f}{metrics['latency_ms_p95']:>10.1f}{metrics['mae']:>8.2f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export and compare size/latency-optimized age model variants.")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--dataset", help="Face dataset folder (default: data/family_dataset)")
+    parser.add_argument("--ages-csv", help="CSV of `name,age` for each family member, for true-age MAE")
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument("--threads", type=int, help="Inference threads for latency measurement")
+    args = parser.parse_args()
+
+    result = optimize(args.models_dir, args.dataset, args.ages_csv, args.variants, args.threads)
+    print(format_report(result))
+    print(f"✅ Report written to {result['report_path']}")
+    print("Copy the chosen variant to models/age_model.tflite to use it at runtime.")
@@ -1,11 +1,13 @@
 import sys
 import os
-import time
 import argparse
 import platform
 import logging
 import tempfile
-from .host_blocker import block_sites, unblock_sites, is_admin, get_hosts_path, block_marker_start, block_marker_end, redirect_ip, blocked_sites
+import hashlib
+from . import hosts_file
+from .hosts_watcher import FileWatcher
+from .host_blocker import block_sites, unblock_sites, is_admin, get_hosts_path, block_marker_start, block_marker_end, redirect_ip, hosts_entries
 
 
 log_file = os.path.join(tempfile.gettempdir(), "aichildprotect_blocker.log")
@@ -13,8 +15,10 @@ logging.basicConfig(filename=log_file, level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
 
+# Polling interval when inotify is unavailable, and the full re-check interval either way
 CHECK_INTERVAL_SECONDS = 15 
-MAX_HOSTS_FILE_SIZE = 5 * 1024 * 1024 
+FULL_RECHECK_SECONDS = 300
+MAX_HOSTS_FILE_SIZE = 64 * 1024 * 1024 # Imported blocklists can hold hundreds of thousands of entries
 
 
 def check_termination_signal(signal_file):
@@ -22,71 +26,20 @@ def check_termination_signal(signal_file):
     return os.path.exists(signal_file)
 
 def ensure_block_applied(hosts_path):
-    """More careful check and application of the block."""
+    """Full check: parse the hosts file and make the managed section match hosts_entries()."""
     try:
         
         if os.path.exists(hosts_path) and os.path.getsize(hosts_path) > MAX_HOSTS_FILE_SIZE:
             logging.error(f"Hosts file {hosts_path} is too large (> {MAX_HOSTS_FILE_SIZE} bytes). Skipping modification.")
             return f"Error: Hosts file too large."
 
-        with open(hosts_path, 'r+') as file:
-            content = file.read()
-            lines_to_add = []
-            needs_update = False
-
-            
-            start_index = content.find(block_marker_start)
-            end_index = content.find(block_marker_end)
-
-            if start_index == -1 or end_index == -1 or start_index >= end_index:
-                
-                logging.info("Block markers not found or invalid. Adding new block section.")
-                
-                content = content.replace(block_marker_start, "").replace(block_marker_end, "")
-                content = content.strip() 
-
-                file.seek(0)
-                file.write(content) 
-                if not content.endswith('\n') and content:
-                     file.write('\n')
-                file.write(f"\n{block_marker_start}\n")
-                for site in blocked_sites:
-                    file.write(f"{redirect_ip} {site}\n")
-                file.write(f"{block_marker_end}\n")
-                file.truncate()
-                needs_update = True 
-                logging.info("Added new block section to hosts file.")
-                return "✅ Block section created."
-
-            else:
-                
-                current_block = content[start_index:end_index + len(block_marker_end)]
-                existing_blocked = set()
-                for line in current_block.splitlines():
-                    parts = line.strip().split()
-                    if len(parts) >= 2 and parts[0] == redirect_ip:
-                        existing_blocked.add(parts[1])
-
-                missing_sites = [site for site in blocked_sites if site not in existing_blocked]
-
-                if missing_sites:
-                    logging.info(f"Found missing sites in block: {missing_sites}. Adding them.")
-                    
-                    insert_pos = end_index
-                    new_entries = "".join([f"{redirect_ip} {site}\n" for site in missing_sites])
-
-                    file.seek(insert_pos)
-                    remaining_content = file.read() 
-                    file.seek(insert_pos)
-                    file.write(new_entries)
-                    file.write(remaining_content)
-                    file.truncate()
-                    needs_update = True 
-                    logging.info(f"Added {len(missing_sites)} missing sites to block section.")
-                    return f"✅ Added {len(missing_sites)} missing sites."
-                else:
-                     logging.debug("All required sites seem present in the block section.")
-                     return "✅ Block already seems correct."
+        changed, added, removed = hosts_file.apply_block(hosts_path, hosts_entries(), redirect_ip,
+                                                         block_marker_start, block_marker_end)
+        if not changed:
+            logging.debug("All required sites seem present in the block section.")
+            return "✅ Block already seems correct."
+        logging.info(f"Block section rewritten: {len(added)} sites added, {len(removed)} removed.")
+        return f"✅ Block section updated ({len(added)} added, {len(removed)} removed)."
 
     except PermissionError:
         logging.error("Permission denied when trying to access hosts file.")
@@ -99,6 +52,41 @@ def ensure_block_applied(hosts_path):
         return f"Error: Unexpected error {e}"
 
 
+def stat_signature(hosts_path):
+    st = os.stat(hosts_path)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def content_digest(hosts_path):
+    with open(hosts_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def enforce_if_changed(hosts_path, verified):
+    """Run the full check only when the hosts file changed since it was last verified.
+
+    `verified` holds the stat signature (mtime, size, inode) and content hash of
+    the last verified state. An unchanged signature costs a single stat; a
+    changed signature with identical content (e.g. a touch) just refreshes it.
+    Returns None when nothing needed checking, else the ensure_block_applied status.
+    """
+    signature = stat_signature(hosts_path)
+    if signature == verified.get("signature"):
+        return None
+    digest = content_digest(hosts_path)
+    if digest == verified.get("digest"):
+        verified["signature"] = signature
+        return None
+
+    status = ensure_block_applied(hosts_path)
+    if "Error" in status:
+        verified.clear()
+    else:
+        verified["signature"] = stat_signature(hosts_path)
+        verified["digest"] = content_digest(hosts_path)
+    return status
+
+
 
 def main(signal_file):
     logging.info("Background blocker script started.")
@@ -124,6 +112,10 @@ def main(signal_file):
          sys.exit(1)
 
 
+    verified = {} # Stat signature and content hash of the last verified hosts file
+    # Wake on edits to the hosts file and on creation of the termination signal file
+    watcher = FileWatcher([hosts_path, signal_file], poll_interval=CHECK_INTERVAL_SECONDS)
+    logging.info(f"Watching hosts and signal files ({watcher.backend})")
     while True:
         
         if check_termination_signal(signal_file):
@@ -148,20 +140,25 @@ def main(signal_file):
                  sys.exit(0) 
 
         
-        logging.info("Checking and applying website block...")
+        logging.debug("Checking and applying website block...")
         try:
-            status = ensure_block_applied(hosts_path)
-            logging.info(f"Block status: {status}")
-            if "Error" in status:
-                 print(f"Blocker status: {status}", file=sys.stderr) 
+            status = enforce_if_changed(hosts_path, verified)
+            if status is None:
+                logging.debug("Hosts file unchanged since last verification.")
+            else:
+                logging.info(f"Block status: {status}")
+                if "Error" in status:
+                     print(f"Blocker status: {status}", file=sys.stderr) 
         except Exception as e:
             logging.exception("Error during block application loop.")
             print(f"Error in blocker loop: {e}", file=sys.stderr)
 
 
         
-        logging.debug(f"Sleeping for {CHECK_INTERVAL_SECONDS} seconds.")
-        time.sleep(CHECK_INTERVAL_SECONDS)
+        logging.debug("Waiting for hosts file or signal file changes.")
+        if not watcher.wait(timeout=FULL_RECHECK_SECONDS):
+            # Periodic safety net: force a full parse even if the stat signature looks unchanged
+            verified.clear()
 
 
 if __name__ == "__main__":
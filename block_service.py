@@ -8,6 +8,7 @@ import argparse
 import signal
 import logging
 from .host_blocker import block_sites, is_admin, hosts_path, test_site_blocking
+from .hosts_watcher import FileWatcher
 
 
 log_dir = os.path.join(tempfile.gettempdir(), "ai_child_protection_logs")
@@ -22,6 +23,8 @@ logging.basicConfig(
 
 
 running = True
+watcher = None
+# Full re-check interval; hosts-file edits are handled as they happen by the watcher
 CHECK_INTERVAL = 300  
 
 def signal_handler(sig, frame):
@@ -29,6 +32,8 @@ def signal_handler(sig, frame):
     global running
     logging.info(f"Received signal {sig}, shutting down...")
     running = False
+    if watcher is not None:
+        watcher.wake()
 
 def create_windows_service():
     """Create a Windows service to run the blocker on startup"""
@@ -220,8 +225,8 @@ def is_service_running():
         return False
 
 def run_daemon():
-    """Run as a daemon process, periodically checking and enforcing site blocking"""
-    global running
+    """Run as a daemon process, enforcing site blocking whenever the hosts file changes"""
+    global running, watcher
     
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
@@ -232,28 +237,31 @@ def run_daemon():
         logging.error("Admin/root privileges required to run the service")
         return "❌ Admin/root privileges required to run the service"
     
+    watcher = FileWatcher([hosts_path])
+    logging.info(f"Watching {hosts_path} ({watcher.backend})")
+    changed = None
     while running:
         try:
             
-            logging.info("Checking and enforcing site blocking")
+            logging.info("Hosts file changed; re-applying site blocking" if changed else
+                         "Checking and enforcing site blocking")
             result = block_sites()
             logging.info(f"Block result: {result}")
             
+            if not changed:
+                test_result = test_site_blocking("pornhub.com")
+                logging.info(f"Block test: {test_result}")
             
-            test_result = test_site_blocking("pornhub.com")
-            logging.info(f"Block test: {test_result}")
-            
-            
-            for _ in range(CHECK_INTERVAL):
-                if not running:
-                    break
-                time.sleep(1)
+            # Sleeps without CPU use until the hosts file is touched, a signal arrives or the re-check is due
+            changed = watcher.wait(timeout=CHECK_INTERVAL)
         
         except Exception as e:
             logging.exception(f"Error in daemon loop: {e}")
             
             time.sleep(60)
     
+    watcher.close()
+    watcher = None
     logging.info("Block service daemon shutting down")
     return "✅ Service stopped"
 
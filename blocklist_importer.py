@@ -0,0 +1,202 @@
+import os
+import io
+import re
+import gzip
+import json
+import heapq
+import hashlib
+import tempfile
+import argparse
+from . import domain_rules
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BLOCKLIST_DIR = os.path.join(BASE_DIR, 'data', 'blocklists')
+ARTIFACT_FILENAME = "blocklist.txt.gz"
+MANIFEST_FILENAME = "blocklist.json"
+# Rules held in memory before a sorted run is spilled to disk
+CHUNK_SIZE = 200000
+
+_LABEL = r"[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9_])?"
+_HOSTNAME = re.compile(rf"^{_LABEL}(?:\.{_LABEL})+$")
+_IPV4 = re.compile(r"^\d{1,3}(?:\.\d{1,3}){3}$")
+_HOSTS_IGNORED = {"localhost", "localhost.localdomain", "local", "broadcasthost", "ip6-localhost",
+                  "ip6-loopback", "ip6-localnet", "ip6-mcastprefix", "ip6-allnodes", "ip6-allrouters",
+                  "ip6-allhosts", "0.0.0.0"}
+# Adblock rule options that still mean "block every request to the domain"
+_WHOLE_DOMAIN_OPTIONS = {"important", "all", "document", "doc"}
+
+
+def normalize_domain(domain):
+    """Lowercase, strip the trailing dot and IDNA-encode a domain; None if it is not a valid hostname."""
+    domain = domain.strip().lower().rstrip(".")
+    if not domain or len(domain) > 253 or _IPV4.match(domain):
+        return None
+    if not domain.isascii():
+        try:
+            domain = domain.encode("idna").decode("ascii")
+        except UnicodeError:
+            return None
+    return domain if _HOSTNAME.match(domain) else None
+
+
+def parse_line(line):
+    """Yield domain_rules rule strings from one line of a hosts, plain-domain or Adblock list."""
+    line = line.strip()
+    if not line or line[0] in "#![":
+        return
+    if line.startswith("||"):
+        # Adblock network rule: only whole-domain blocks translate to DNS-level rules. Options
+        # such as $third-party, $script or $popup limit a rule to some requests, and
+        # blocking the whole domain for them could take mainstream sites offline
+        body, _, options = line[2:].partition("$")
+        host = body[:-1] if body.endswith("^") else body
+        if options and not set(options.lower().split(",")) <= _WHOLE_DOMAIN_OPTIONS:
+            return
+        if "/" in host or "*" in host or not body.endswith("^"):
+            return
+        domain = normalize_domain(host)
+        if domain:
+            yield "." + domain
+        return
+    if line.startswith("@@") or "##" in line or "#@#" in line:
+        return # Adblock exceptions and cosmetic filters
+    tokens = line.split("#", 1)[0].split()
+    if not tokens:
+        return
+    if len(tokens) > 1 and (_IPV4.match(tokens[0]) or ":" in tokens[0]):
+        # hosts format: IP followed by one or more hostnames
+        for token in tokens[1:]:
+            if token.lower() not in _HOSTS_IGNORED:
+                domain = normalize_domain(token)
+                if domain:
+                    yield domain
+        return
+    if len(tokens) == 1:
+        token = tokens[0]
+        prefix = ""
+        if token.startswith("*."):
+            prefix, token = "*.", token[2:]
+        elif token.startswith("."):
+            prefix, token = ".", token[1:]
+        domain = normalize_domain(token)
+        if domain:
+            yield prefix + domain
+
+
+def iter_rules(paths):
+    """Stream rules from each list file line by line (gzip-compressed lists are read transparently)."""
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                yield from parse_line(line)
+
+
+def _spill(chunk, temp_dir):
+    fd, path = tempfile.mkstemp(dir=temp_dir, prefix="run.", suffix=".txt")
+    with os.fdopen(fd, "w", encoding="ascii") as f:
+        f.writelines(rule + "\n" for rule in sorted(chunk))
+    return path
+
+
+def sorted_unique(rules, chunk_size=CHUNK_SIZE, temp_dir=None):
+    """External-sort dedupe: yields each distinct rule once, in sorted order, holding at most `chunk_size` in memory."""
+    with tempfile.TemporaryDirectory(dir=temp_dir, prefix="blocklist.") as work_dir:
+        runs = []
+        chunk = set()
+        for rule in rules:
+            chunk.add(rule)
+            if len(chunk) >= chunk_size:
+                runs.append(_spill(chunk, work_dir))
+                chunk = set()
+        if not runs:
+            yield from sorted(chunk)
+            return
+        if chunk:
+            runs.append(_spill(chunk, work_dir))
+        files = [open(path, "r", encoding="ascii") for path in runs]
+        try:
+            previous = None
+            for line in heapq.merge(*files):
+                if line != previous:
+                    yield line.rstrip("\n")
+                    previous = line
+        finally:
+            for f in files:
+                f.close()
+
+
+def _rule_kind(rule):
+    if rule.startswith("*."):
+        return "wildcard"
+    return {".": "suffix", "~": "keyword"}.get(rule[0], "exact")
+
+
+def import_blocklists(paths, output_dir=BLOCKLIST_DIR, chunk_size=CHUNK_SIZE):
+    """Parse, normalise and dedupe the given lists into a sorted, gzip-compressed rule file.
+
+    The artifact and its manifest are written atomically, so readers never see a partial list.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    artifact_path = os.path.join(output_dir, ARTIFACT_FILENAME)
+    counts = {kind: 0 for kind in domain_rules.RULE_KINDS}
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=output_dir, prefix=".blocklist.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) as gz:
+            writer = io.TextIOWrapper(gz, encoding="ascii", newline="\n")
+            for rule in sorted_unique(iter_rules(paths), chunk_size):
+                writer.write(rule + "\n")
+                digest.update(rule.encode("ascii") + b"\n")
+                counts[_rule_kind(rule)] += 1
+            writer.flush()
+            writer.detach()
+        os.replace(temp_path, artifact_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    manifest = {
+        "artifact": ARTIFACT_FILENAME,
+        "sources": [os.path.abspath(path) for path in paths],
+        "rules": sum(counts.values()),
+        "by_kind": counts,
+        "sha256": digest.hexdigest(),
+        "size_bytes": os.path.getsize(artifact_path),
+    }
+    manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return manifest
+
+
+def artifact_path(output_dir=BLOCKLIST_DIR):
+    """Path of the compiled blocklist, or None if no list has been imported."""
+    path = os.path.join(output_dir, ARTIFACT_FILENAME)
+    return path if os.path.exists(path) else None
+
+
+def load_blocklist(path):
+    """Yield the rule strings stored in a compiled blocklist artifact."""
+    with gzip.open(path, "rt", encoding="ascii") as f:
+        for line in f:
+            rule = line.rstrip("\n")
+            if rule:
+                yield rule
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import hosts / plain-domain / Adblock blocklists into a compiled artifact.")
+    parser.add_argument("lists", nargs="+", help="Blocklist files (optionally .gz)")
+    parser.add_argument("--output-dir", default=BLOCKLIST_DIR)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="Rules kept in memory before spilling a sorted run to disk")
+    args = parser.parse_args()
+
+    result = import_blocklists(args.lists, args.output_dir, args.chunk_size)
+    kinds = ", ".join(f"{count} {kind}" for kind, count in result["by_kind"].items() if count)
+    print(f"✅ {result['rules']} rules ({kinds}) written to {os.path.join(args.output_dir, ARTIFACT_FILENAME)} "
+          f"({result['size_bytes'] / 1024:.0f} KB)")
@@ -4,7 +4,8 @@ import shutil
 import tempfile
 import platform
 import webbrowser
-from .host_blocker import blocked_sites
+from .host_blocker import compiled_rules
+from .domain_rules import JS_MATCHER
 
 def create_chrome_extension():
     """
@@ -44,17 +45,12 @@ def create_chrome_extension():
     
     
     background_js = """
-// List of sites to block
-const blockedSites = %s;
-
+// Compiled blocklist rules (reversed-label trie + keywords)
+const blockRules = %s;
+%s
 // Function to check if a URL should be blocked
 function shouldBlockUrl(url) {
-    for (const site of blockedSites) {
-        if (url.includes(site)) {
-            return true;
-        }
-    }
-    return false;
+    return isBlockedHost(hostFromUrl(url));
 }
 
 // Listen for web requests
@@ -77,7 +73,7 @@ chrome.tabs.onUpdated.addListener(
         }
     }
 );
-""" % json.dumps(blocked_sites)
+""" % (compiled_rules().to_json(), JS_MATCHER)
     
     
     popup_html = """
@@ -215,17 +211,12 @@ def create_firefox_extension():
     
     
     background_js = """
-// List of sites to block
-const blockedSites = %s;
-
+// Compiled blocklist rules (reversed-label trie + keywords)
+const blockRules = %s;
+%s
 // Function to check if a URL should be blocked
 function shouldBlockUrl(url) {
-    for (const site of blockedSites) {
-        if (url.includes(site)) {
-            return true;
-        }
-    }
-    return false;
+    return isBlockedHost(hostFromUrl(url));
 }
 
 // Listen for web requests
@@ -248,7 +239,7 @@ browser.tabs.onUpdated.addListener(
         }
     }
 );
-""" % json.dumps(blocked_sites)
+""" % (compiled_rules().to_json(), JS_MATCHER)
     
     
     popup_html = """
@@ -0,0 +1,260 @@
+import threading
+import time
+import queue
+import logging
+from collections import deque
+from . import detector
+from . import frame_source
+
+
+class FrameRing:
+    """Bounded FIFO that drops the oldest item when full, so consumers always see fresh frames."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._items = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self.capacity:
+                self.dropped += 1
+            self._items.append(item)
+            self.put_count += 1
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def depth(self):
+        with self._cond:
+            return len(self._items)
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class StageQueue:
+    """Bounded queue that blocks producers when full to propagate backpressure upstream."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._queue = queue.Queue(maxsize=capacity)
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, item, stop_event):
+        while not stop_event.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                self.put_count += 1
+                return True
+            except queue.Full:
+                continue
+        self.dropped += 1
+        return False
+
+    def get(self, timeout=None):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def depth(self):
+        return self._queue.qsize()
+
+
+class PipelineResult:
+    __slots__ = ("seq", "timestamp", "frame", "faces")
+
+    def __init__(self, seq, timestamp, frame, faces):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.frame = frame
+        self.faces = faces
+
+
+def _pending_age_rows(result):
+    # Tracked faces keep their cached age, so only unaged, recognised rows need inference
+    return [i for i, face in enumerate(result.faces)
+            if face['age'] == -1 and detector.face_name(face['label']) not in ("Error", "Unknown")]
+
+
+class CapturePipeline:
+    """Capture -> detection -> inference stages, each on its own thread.
+
+    The capture ring drops stale frames when detection falls behind, detection
+    blocks on the inference queue (backpressure), and inference batches age
+    predictions across all queued frames before publishing to the output ring.
+    """
+
+    def __init__(self, source=0, ring_size=2, detection_queue_size=4,
+                 output_size=2, age_batch_size=8, age_batch_window=0.25, tracker=None, motion_gate=None):
+        # A FrameSource, or anything open_frame_source accepts (device index, path, URL)
+        self.source = source
+        self.tracker = tracker
+        # Optional MotionGate: frames of an unchanged scene reuse the previous faces without detection
+        self.motion_gate = motion_gate
+        self.age_batch_size = age_batch_size
+        self.age_batch_window = age_batch_window
+        self.capture_ring = FrameRing(ring_size)
+        self.detection_queue = StageQueue(detection_queue_size)
+        # Inference publishes a whole age batch back to back; a smaller ring would evict
+        # most of it (and the ages it carries) before the consumer could read it
+        self.output_ring = FrameRing(max(output_size, age_batch_size))
+        self.error = None
+        self._stop = threading.Event()
+        self._threads = []
+        self._cap = None
+
+    def start(self):
+        if isinstance(self.source, frame_source.FrameSource):
+            self._cap = self.source
+            if not self._cap.isOpened():
+                self._cap.open()
+        else:
+            self._cap = frame_source.open_frame_source(self.source)
+        if not self._cap.isOpened():
+            self.error = "Cannot open frame source."
+            return False
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._detection_loop, name="detection", daemon=True),
+            threading.Thread(target=self._inference_loop, name="inference", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        self.capture_ring.close()
+        self.output_ring.close()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+    def get_result(self, timeout=None):
+        return self.output_ring.get(timeout)
+
+    def stats(self):
+        stats = {
+            "capture": {"depth": self.capture_ring.depth(), "capacity": self.capture_ring.capacity,
+                        "frames": self.capture_ring.put_count, "dropped": self.capture_ring.dropped},
+            "detection": {"depth": self.detection_queue.depth(), "capacity": self.detection_queue.capacity,
+                          "frames": self.detection_queue.put_count, "dropped": self.detection_queue.dropped},
+            "output": {"depth": self.output_ring.depth(), "capacity": self.output_ring.capacity,
+                       "frames": self.output_ring.put_count, "dropped": self.output_ring.dropped},
+        }
+        if self.motion_gate is not None:
+            stats["motion"] = self.motion_gate.stats()
+        return stats
+
+    def _capture_loop(self):
+        seq = 0
+        failures = 0
+        while not self._stop.is_set():
+            ret, frame = self._cap.read()
+            if not ret:
+                failures += 1
+                if failures >= 50:
+                    self.error = "Cannot read frames from source."
+                    logging.error(self.error)
+                    break
+                # Wait on the stop event instead of sleeping so shutdown stays prompt
+                self._stop.wait(0.1)
+                continue
+            failures = 0
+            self.capture_ring.put((seq, time.time(), frame))
+            seq += 1
+        self.capture_ring.close()
+
+    def _detection_loop(self):
+        last_faces = None
+        while not self._stop.is_set():
+            item = self.capture_ring.get(timeout=0.5)
+            if item is None:
+                if self.capture_ring.closed:
+                    break
+                continue
+            seq, timestamp, frame = item
+            try:
+                moving = self.motion_gate is None or self.motion_gate.check(frame)
+                if not moving and last_faces is not None:
+                    # Static scene: the previous boxes, labels and ages still hold
+                    faces = last_faces.copy()
+                    if self.tracker is not None:
+                        self.tracker.skip_frame()
+                elif self.tracker is not None:
+                    faces = self.tracker.update(frame, with_age=False)
+                else:
+                    faces = detector.predict_faces(frame, with_age=False)
+            except Exception as e:
+                logging.warning(f"Error in detection stage: {e}")
+                continue
+            last_faces = faces
+            self.detection_queue.put(PipelineResult(seq, timestamp, frame, faces), self._stop)
+
+    def _inference_loop(self):
+        while not self._stop.is_set():
+            first = self.detection_queue.get(timeout=0.5)
+            if first is None:
+                continue
+            batch = [first]
+            deadline = time.time() + self.age_batch_window
+            face_count = len(_pending_age_rows(first))
+            # Gather more frames until the batch is full or the window closes;
+            # frames with no unaged, recognised face have no age work and are published at once
+            while 0 < face_count < self.age_batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                item = self.detection_queue.get(timeout=remaining)
+                if item is None:
+                    break
+                batch.append(item)
+                face_count += len(_pending_age_rows(item))
+            self._run_age_batch(batch)
+            for result in batch:
+                self.output_ring.put(result)
+
+    def _run_age_batch(self, batch):
+        frames = []
+        coords = []
+        rows = []
+        for result in batch:
+            known = _pending_age_rows(result)
+            if not known:
+                continue
+            frames.append(result.frame)
+            coords.append([(int(result.faces[i]['x']), int(result.faces[i]['y']),
+                            int(result.faces[i]['w']), int(result.faces[i]['h'])) for i in known])
+            rows.append((result, known))
+        if not frames:
+            return
+        try:
+            ages = detector.predict_age_batch(frames, coords)
+        except Exception as e:
+            logging.warning(f"Error in inference stage: {e}")
+            return
+        for (result, known), frame_ages in zip(rows, ages):
+            for i, age in zip(known, frame_ages):
+                result.faces[i]['age'] = age
+                if self.tracker is not None and age != -1:
+                    self.tracker.set_age(int(result.faces[i]['track_id']), age)
@@ -11,10 +11,16 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtGui import QImage, QPixmap, QFont
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal # Removed QCoreApplication, Added pyqtSignal
+from face_operations import face_detectors
+from face_operations import frame_source
 
 # Define base path relative to this script's location
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
+MODELS_DIR = os.path.join(BASE_DIR, 'models')
+CAMERA_SOURCE = 0
+CAPTURE_WIDTH = 640
+CAPTURE_HEIGHT = 480
 
 # Inherit from QDialog instead of QWidget
 class DatasetCreatorDialog(QDialog):
@@ -36,6 +42,7 @@ class DatasetCreatorDialog(QDialog):
         self.last_face_coords = None
         self.total_members_needed = 0
         self.members_completed = 0
+        self.captured_images = {} # Member name -> image paths saved in this session
         self.initialization_ok = True # Flag for successful init
 
         # Ask for number of members directly in constructor
@@ -122,7 +129,7 @@ class DatasetCreatorDialog(QDialog):
 
     # init_camera modified to return success/failure
     def init_camera(self):
-        self.cap = cv2.VideoCapture(0)
+        self.cap = frame_source.open_frame_source(CAMERA_SOURCE, CAPTURE_WIDTH, CAPTURE_HEIGHT)
         if not self.cap.isOpened():
             self.show_error("Cannot open webcam.")
             self.capture_active = False
@@ -130,7 +137,8 @@ class DatasetCreatorDialog(QDialog):
             return False # Indicate failure
 
         self.capture_active = True
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        # Same backend as monitoring (calibrated choice, Haar fallback)
+        self.face_detector = face_detectors.create_default_detector(MODELS_DIR)
 
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_frame)
@@ -194,8 +202,10 @@ class DatasetCreatorDialog(QDialog):
             time.sleep(0.1)
             return
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=5, minSize=(80, 80))
+        if self.face_detector.needs_color:
+            faces = self.face_detector.detect(frame, 80)
+        else:
+            faces = self.face_detector.detect(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), 80)
 
         self.face_detected = len(faces) > 0
         status_prefix = f"Member {self.members_completed + 1}/{self.total_members_needed}: "
@@ -283,6 +293,7 @@ class DatasetCreatorDialog(QDialog):
         img_save_path = os.path.join(self.member_folder, image_name)
         try:
             cv2.imwrite(img_save_path, face_image)
+            self.captured_images.setdefault(self.member_name, []).append(img_save_path)
             self.count += 1
             self.update_status(f"Saved image {self.count}/{self.max_images} for {self.member_name}")
             self.update_progress_label()
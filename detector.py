@@ -1,10 +1,13 @@
 import cv2
-import os
-import pickle
 import numpy as np
-from tensorflow.keras.models import load_model
 import time
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from . import face_embedding
+from . import age_backends
+from . import face_detectors
 
 
 if not logging.getLogger().hasHandlers():
@@ -12,24 +15,53 @@ if not logging.getLogger().hasHandlers():
 
 
 knn_model = None
+face_index = None
 label_map = None
 age_model = None
-face_cascade = None
+face_backend = None
+
+# Face detector backend: "auto" uses the calibrated choice (see face_detectors.calibrate), else Haar
+FACE_DETECTOR_BACKEND = "auto"
+
+# Age inference backend: "auto" prefers a converted TFLite/ONNX model over Keras
+AGE_BACKEND = "auto"
+AGE_BACKEND_THREADS = None
+
+# Detection pyramid: scan a downscaled frame, and between full scans only a
+# margin around the previous faces (new faces elsewhere appear at the next full scan).
+# FULL_SCAN_INTERVAL counts frames through predict_faces; FaceTracker already spaces
+# its detections out with optical flow, so its redetections always scan the full frame
+DETECTION_SCALE = 0.5
+DETECTION_MIN_FACE = 60
+ROI_MARGIN = 0.5
+FULL_SCAN_INTERVAL = 15
+
+detection_stats = {"frames": 0, "full_scans": 0, "roi_scans": 0, "pixels_scanned": 0, "frame_pixels": 0}
+_detection_state = {"boxes": [], "frames_since_full": 0}
+
+load_stats = {}
+inference_stats = {"age_faces": 0, "age_seconds": 0.0}
+_load_lock = threading.Lock()
+_load_executor = None
+_load_future = None
+
+FACE_DTYPE = np.dtype([
+    ('x', np.int32), ('y', np.int32), ('w', np.int32), ('h', np.int32),
+    ('label', np.int32), ('age', np.int16), ('track_id', np.int32),
+])
 
 def load_models(models_dir):
-    global knn_model, label_map, age_model, face_cascade
+    global knn_model, face_index, label_map, age_model, face_backend
     models_loaded = True
     logging.info("Loading models...")
 
     
     if knn_model is None or label_map is None:
         try:
-            recog_model_path = os.path.join(models_dir, "face_recognition_model.pkl")
-            label_map_path = os.path.join(models_dir, "label_map.pkl")
-            with open(recog_model_path, "rb") as f:
-                knn_model = pickle.load(f)
-            with open(label_map_path, "rb") as f:
-                label_map = pickle.load(f)
+            knn_model, face_index, label_map = face_embedding.load_model(models_dir)
+            if face_index is None:
+                # Models trained before the embedding index hold a raw-pixel KNN
+                logging.warning("Face index not found; using legacy raw-pixel recognizer. Retrain to upgrade.")
             logging.info("Face recognition model loaded.")
         except FileNotFoundError:
             logging.error(f"Face model files not found in {models_dir}")
@@ -41,35 +73,110 @@ def load_models(models_dir):
     
     if age_model is None:
         try:
-            age_model_path = os.path.join(models_dir, "age_model.h5")
-            os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
-            os.environ['KMP_DUPLICATE_LIB_OK']='True'
-            age_model = load_model(age_model_path, compile=False)
-            logging.info("Age prediction model loaded.")
+            age_model = age_backends.create_age_backend(models_dir, AGE_BACKEND, AGE_BACKEND_THREADS)
+            load_stats["age_backend"] = age_model.name
+            logging.info(f"Age prediction model loaded ({age_model.name} backend: {age_model.model_path}).")
         except Exception as e:
-            logging.error(f"Error loading age model ({age_model_path}): {e}")
+            logging.error(f"Error loading age model from {models_dir}: {e}")
             models_loaded = False
 
     
-    if face_cascade is None:
-        cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        if not os.path.exists(cascade_path):
-            logging.error(f"Haar cascade file not found at {cascade_path}")
+    if face_backend is None:
+        try:
+            face_backend = face_detectors.create_default_detector(models_dir, FACE_DETECTOR_BACKEND)
+            load_stats["face_detector"] = face_backend.name
+            logging.info(f"Face detector loaded ({face_backend.name} backend).")
+        except Exception as e:
+            logging.error(f"Error loading face detector: {e}")
             models_loaded = False
-        else:
-            face_cascade = cv2.CascadeClassifier(cascade_path)
-            logging.info("Face cascade loaded.")
 
     return models_loaded
 
+def configure_face_detector(backend="auto"):
+    """Select the face detector backend; takes effect on the next load_models."""
+    global FACE_DETECTOR_BACKEND, face_backend
+    if backend != "auto" and backend not in face_detectors.BACKEND_NAMES:
+        raise ValueError(f"Unknown face detector backend '{backend}'")
+    FACE_DETECTOR_BACKEND = backend
+    face_backend = None
+    _detection_state["boxes"] = []
+
+def configure_age_backend(backend="auto", num_threads=None):
+    """Select the age inference backend and thread count; takes effect on the next load_models."""
+    global AGE_BACKEND, AGE_BACKEND_THREADS, age_model
+    if backend not in age_backends.BACKEND_NAMES:
+        raise ValueError(f"Unknown age backend '{backend}'")
+    AGE_BACKEND, AGE_BACKEND_THREADS = backend, num_threads
+    age_model = None
+
+def _resident_memory_mb():
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+def warm_up_models():
+    """Run one dummy inference through each model so graph tracing happens before the first real frame."""
+    if age_model is not None:
+        age_model.predict(np.zeros((1, 224, 224, 3), dtype=np.float32))
+    if knn_model is not None:
+        _recognize_faces(np.zeros((100, 100), dtype=np.uint8), [(0, 0, 100, 100)])
+
+def _load_and_warm_up(models_dir):
+    started = time.perf_counter()
+    loaded = load_models(models_dir)
+    load_stats["load_seconds"] = time.perf_counter() - started
+    if loaded:
+        warm_started = time.perf_counter()
+        try:
+            warm_up_models()
+        except Exception as e:
+            logging.warning(f"Model warm-up failed: {e}")
+        load_stats["warmup_seconds"] = time.perf_counter() - warm_started
+    load_stats["ready_at"] = time.time()
+    load_stats["rss_mb"] = _resident_memory_mb()
+    logging.info(f"Models ready: load {load_stats['load_seconds']:.2f}s, "
+                 f"warm-up {load_stats.get('warmup_seconds', 0.0):.2f}s")
+    return loaded
+
+def load_models_async(models_dir):
+    """Start loading and warming up models on a background thread.
+
+    Returns a Future resolving to the load_models result. Repeated calls share
+    the same future unless the previous attempt failed.
+    """
+    global _load_executor, _load_future
+    with _load_lock:
+        if _load_future is not None and not (_load_future.done() and not _load_future.result()):
+            return _load_future
+        if _load_executor is None:
+            _load_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+        load_stats.clear()
+        load_stats["requested_at"] = time.time()
+        _load_future = _load_executor.submit(_load_and_warm_up, models_dir)
+        return _load_future
+
+def reload_face_model(models_dir):
+    """Swap in the face recognition model from disk, e.g. after enrolling a member."""
+    global knn_model, face_index, label_map
+    try:
+        projection, index, new_label_map = face_embedding.load_model(models_dir)
+    except Exception as e:
+        logging.error(f"Error reloading face model: {e}")
+        return False
+    knn_model, face_index, label_map = projection, index, new_label_map
+    logging.info("Face recognition model reloaded.")
+    return True
+
 def predict_face(frame):
-    global knn_model, label_map, face_cascade
-    if frame is None or knn_model is None or label_map is None or face_cascade is None:
+    global knn_model, label_map, face_backend
+    if frame is None or knn_model is None or label_map is None or face_backend is None:
         logging.warning("Predict face called before models loaded or with None frame.")
         return None, None 
 
     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(60, 60))
+    faces = _detect_faces(gray, frame)
 
     if len(faces) == 0:
         return "No face", None 
@@ -80,9 +187,7 @@ def predict_face(frame):
 
     
     try:
-        face_image_gray = gray[y:y + h, x:x + w]
-        face_resized_gray = cv2.resize(face_image_gray, (100, 100)).flatten().reshape(1, -1)
-        label_pred = knn_model.predict(face_resized_gray)[0]
+        label_pred = _recognize_faces(gray, [face_coords])[0]
         name = label_map.get(label_pred, "Unknown")
         logging.debug(f"Face recognized: {name}")
         return name, face_coords
@@ -90,85 +195,444 @@ def predict_face(frame):
         logging.warning(f"Error during face recognition prediction: {e}")
         return "Error", face_coords 
 
+def configure_detection(scale=None, min_face=None, roi_margin=None, full_scan_interval=None):
+    global DETECTION_SCALE, DETECTION_MIN_FACE, ROI_MARGIN, FULL_SCAN_INTERVAL
+    if scale is not None:
+        DETECTION_SCALE = min(max(scale, 0.1), 1.0)
+    if min_face is not None:
+        DETECTION_MIN_FACE = min_face
+    if roi_margin is not None:
+        ROI_MARGIN = roi_margin
+    if full_scan_interval is not None:
+        FULL_SCAN_INTERVAL = full_scan_interval
+    _detection_state["boxes"] = []
+
+def _scan_region(gray, frame, x0, y0, x1, y1):
+    # Colour backends (DNN) read the BGR frame; cascades read the grayscale one
+    if face_backend.needs_color:
+        region = frame[y0:y1, x0:x1] if frame is not None else cv2.cvtColor(gray[y0:y1, x0:x1], cv2.COLOR_GRAY2BGR)
+    else:
+        region = gray[y0:y1, x0:x1]
+    if region.size == 0:
+        return []
+    scale = DETECTION_SCALE
+    if scale < 1.0:
+        region = cv2.resize(region, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    min_size = max(1, int(DETECTION_MIN_FACE * scale))
+    detection_stats["pixels_scanned"] += region.shape[0] * region.shape[1]
+    found = face_backend.detect(region, min_size)
+    # Map boxes back to full-resolution coordinates for the crops
+    return [(int(x / scale) + x0, int(y / scale) + y0, int(w / scale), int(h / scale)) for (x, y, w, h) in found]
+
+def _search_roi(gray, frame):
+    frame_h, frame_w = gray.shape[:2]
+    boxes = _detection_state["boxes"]
+    x0 = min(x - int(w * ROI_MARGIN) for x, y, w, h in boxes)
+    y0 = min(y - int(h * ROI_MARGIN) for x, y, w, h in boxes)
+    x1 = max(x + w + int(w * ROI_MARGIN) for x, y, w, h in boxes)
+    y1 = max(y + h + int(h * ROI_MARGIN) for x, y, w, h in boxes)
+    return _scan_region(gray, frame, max(x0, 0), max(y0, 0), min(x1, frame_w), min(y1, frame_h))
+
+def _detect_faces(gray, frame=None, full_scan=False):
+    detection_stats["frames"] += 1
+    detection_stats["frame_pixels"] += gray.shape[0] * gray.shape[1]
+    state = _detection_state
+    if not full_scan and state["boxes"] and state["frames_since_full"] < FULL_SCAN_INTERVAL:
+        faces = _search_roi(gray, frame)
+        if faces:
+            detection_stats["roi_scans"] += 1
+            state["boxes"] = faces
+            state["frames_since_full"] += 1
+            return faces
+
+    faces = _scan_region(gray, frame, 0, 0, gray.shape[1], gray.shape[0])
+    detection_stats["full_scans"] += 1
+    state["boxes"] = faces
+    state["frames_since_full"] = 0
+    return faces
+
+def _recognize_faces(gray, boxes):
+    samples = np.empty((len(boxes), 100 * 100), dtype=np.uint8)
+    for i, (x, y, w, h) in enumerate(boxes):
+        samples[i] = cv2.resize(gray[y:y + h, x:x + w], (100, 100)).ravel()
+    if face_index is None:
+        return knn_model.predict(samples)
+    return face_embedding.query_index(face_index, face_embedding.embed(knn_model, samples))
+
+def face_name(label):
+    if label < 0:
+        return "Error"
+    return label_map.get(int(label), "Unknown")
+
+def predict_faces(frame, with_age=True):
+    """Detect, recognise and optionally age every face in the frame.
+
+    Returns a FACE_DTYPE structured array with one row per detection. Labels
+    are -1 when recognition failed and ages are -1 when not computed.
+    """
+    global knn_model, label_map, face_backend
+    if frame is None or knn_model is None or label_map is None or face_backend is None:
+        logging.warning("Predict faces called before models loaded or with None frame.")
+        return np.zeros(0, dtype=FACE_DTYPE)
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    boxes = _detect_faces(gray, frame)
+    faces = np.zeros(len(boxes), dtype=FACE_DTYPE)
+    if len(boxes) == 0:
+        return faces
+
+    boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+    faces['x'], faces['y'], faces['w'], faces['h'] = boxes.T
+    faces['label'] = -1
+    faces['age'] = -1
+    faces['track_id'] = -1
+
+    try:
+        faces['label'] = _recognize_faces(gray, boxes)
+    except Exception as e:
+        logging.warning(f"Error during face recognition prediction: {e}")
+
+    if with_age and age_model is not None:
+        faces['age'] = predict_age_batch([frame], [boxes])[0]
+    return faces
+
+def _prepare_age_input(frame, face_coords):
+    (x, y, w, h) = face_coords
+    if w <= 0 or h <= 0:
+        return None
+    face_rgb = cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGR2RGB)
+    return cv2.resize(face_rgb, (224, 224)).astype(np.float32) / 255.0
+
 def predict_age(frame, face_coords):
     global age_model
     if frame is None or face_coords is None or age_model is None:
         logging.warning("Predict age called with invalid args or model not loaded.")
         return -1 
 
-    (x, y, w, h) = face_coords
-    if w <= 0 or h <= 0:
-        return -1 
-
     try:
-        face_rgb = cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGR2RGB)
-        face_for_age = cv2.resize(face_rgb, (224, 224)) / 255.0
+        face_for_age = _prepare_age_input(frame, face_coords)
+        if face_for_age is None:
+            return -1
         face_for_age = np.expand_dims(face_for_age, axis=0)
-        predicted_age = int(age_model.predict(face_for_age, verbose=0)[0][0])
+        predicted_age = int(age_model.predict(face_for_age)[0])
         logging.debug(f"Age predicted: {predicted_age}")
         return predicted_age
     except Exception as e:
         logging.warning(f"Error during age prediction: {e}")
         return -1 
 
+def predict_age_batch(frames, face_coords_list):
+    """Predict ages for every face of every frame with a single forward pass.
 
+    face_coords_list[i] is the sequence of (x, y, w, h) boxes found in frames[i].
+    Returns a list aligned with frames holding one age per box (-1 on failure).
+    """
+    global age_model
+    ages = [[-1] * (0 if coords is None else len(coords)) for coords in face_coords_list]
+    if age_model is None:
+        logging.warning("Predict age batch called before age model loaded.")
+        return ages
+
+    crops = []
+    slots = []
+    for i, (frame, coords) in enumerate(zip(frames, face_coords_list)):
+        if frame is None or coords is None or len(coords) == 0:
+            continue
+        for j, face_coords in enumerate(coords):
+            try:
+                crop = _prepare_age_input(frame, face_coords)
+            except Exception as e:
+                logging.warning(f"Error preparing face crop for age batch: {e}")
+                continue
+            if crop is not None:
+                crops.append(crop)
+                slots.append((i, j))
+
+    if not crops:
+        return ages
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    try:
+        batch = np.stack(crops)
+        started = time.perf_counter()
+        predictions = age_model.predict(batch)
+        inference_stats["age_seconds"] += time.perf_counter() - started
+        inference_stats["age_faces"] += len(crops)
+        for (i, j), prediction in zip(slots, predictions):
+            ages[i][j] = int(prediction)
+        logging.debug(f"Batched age prediction for {len(crops)} faces.")
+    except Exception as e:
+        logging.warning(f"Error during batched age prediction: {e}")
+    return ages
+
+
+def record_ages(faces, age_history, window=5):
+    """Fold the ages of recognised faces into each person's rolling window.
+
+    Returns the youngest stable age across everyone in `age_history`, or -1.
+    """
+    for face in faces:
+        if face['age'] != -1 and face_name(face['label']) not in ["Error", "Unknown"]:
+            history = age_history.setdefault(int(face['label']), [])
+            history.append(int(face['age']))
+            if len(history) > window:
+                history.pop(0)
+    stable_ages = [int(np.mean(history)) for history in age_history.values() if history]
+    return min(stable_ages) if stable_ages else -1
+
+
+def _box_iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def crop_fingerprint(gray, box):
+    """64-bit difference hash of a face crop; small Hamming distance means the same-looking face."""
+    x, y, w, h = box
+    crop = gray[y:y + h, x:x + w]
+    if crop.size == 0:
+        return None
+    small = cv2.resize(crop, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+class FaceResultCache:
+    """LRU cache of recognition/age results keyed by track id and checked against a crop fingerprint.
+
+    An entry is reused while it is younger than `ttl_seconds` and the current
+    crop's fingerprint is within `max_distance` bits of the one that was
+    classified; otherwise the caller must classify the face again.
+    """
+
+    def __init__(self, ttl_seconds=10.0, max_entries=64, max_distance=10):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, fingerprint, now=None):
+        now = time.monotonic() if now is None else now
+        entry = self._entries.get(key)
+        if entry is None or fingerprint is None:
+            self.misses += 1
+            return None
+        stored_fingerprint, label, age, stored_at = entry
+        if now - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        if bin(stored_fingerprint ^ fingerprint).count("1") > self.max_distance:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return label, age
+
+    def put(self, key, fingerprint, label, age, now=None):
+        if fingerprint is None:
+            return
+        now = time.monotonic() if now is None else now
+        self._entries[key] = (fingerprint, label, age, now)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def set_age(self, key, age):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries[key] = (entry[0], entry[1], age, entry[3])
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _Track:
+    __slots__ = ("track_id", "box", "points", "quality", "label", "age")
+
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = box
+        self.points = None
+        self.quality = 1.0
+        self.label = None
+        self.age = -1
+
+
+class FaceTracker:
+    """Propagates face boxes with sparse optical flow between full Haar detections.
+
+    Full detection runs every `detect_interval` frames, or sooner when any track
+    loses too many of its flow points. Recognition labels and ages come from a
+    FaceResultCache, so a tracked face is only classified again when its crop
+    fingerprint changes or its cache entry expires.
+    """
+
+    def __init__(self, detect_interval=10, min_quality=0.5, iou_threshold=0.3, cache=None):
+        self.detect_interval = detect_interval
+        self.min_quality = min_quality
+        self.iou_threshold = iou_threshold
+        self.cache = cache if cache is not None else FaceResultCache()
+        self._tracks = []
+        self._prev_gray = None
+        self._frames_since_detect = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.detections_run = 0
+        self.frames_tracked = 0
+
+    def reset(self):
+        with self._lock:
+            self._tracks = []
+            self._prev_gray = None
+            self._frames_since_detect = 0
+            self.cache.clear()
+
+    def skip_frame(self):
+        """Note a frame that was not passed to update() (e.g. gated out as static).
+
+        Optical flow from the last tracked frame would span an unknown gap, so the
+        next update() redetects instead; tracks, labels and cached ages are kept.
+        """
+        with self._lock:
+            self._prev_gray = None
+
+    def set_age(self, track_id, age):
+        with self._lock:
+            for track in self._tracks:
+                if track.track_id == track_id:
+                    track.age = age
+                    break
+            self.cache.set_age(track_id, age)
+
+    def update(self, frame, with_age=True):
+        if frame is None or knn_model is None or label_map is None or face_backend is None:
+            logging.warning("Face tracker updated before models loaded or with None frame.")
+            return np.zeros(0, dtype=FACE_DTYPE)
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        with self._lock:
+            needs_detection = (
+                self._prev_gray is None
+                or not self._tracks
+                or self._frames_since_detect >= self.detect_interval
+            )
+            if not needs_detection:
+                self._propagate(gray)
+                needs_detection = any(track.quality < self.min_quality for track in self._tracks)
+
+            if needs_detection:
+                self._redetect(gray, frame)
+                self.detections_run += 1
+                self._frames_since_detect = 0
+            else:
+                self._frames_since_detect += 1
+                self.frames_tracked += 1
+
+            self._classify(frame, gray, with_age)
+            self._prev_gray = gray
+
+            faces = np.zeros(len(self._tracks), dtype=FACE_DTYPE)
+            for i, track in enumerate(self._tracks):
+                faces[i] = (*track.box, track.label, track.age, track.track_id)
+            return faces
+
+    def _seed_points(self, gray, track):
+        x, y, w, h = track.box
+        # Shrink the box a little so background corners are not tracked
+        mx, my = w // 6, h // 6
+        roi = gray[y + my:y + h - my, x + mx:x + w - mx]
+        points = None
+        if roi.size:
+            points = cv2.goodFeaturesToTrack(roi, maxCorners=30, qualityLevel=0.01, minDistance=5)
+        if points is not None:
+            points = points + np.array([[x + mx, y + my]], dtype=np.float32)
+        track.points = points
+        track.quality = 1.0 if points is not None and len(points) >= 4 else 0.0
+
+    def _propagate(self, gray):
+        frame_h, frame_w = gray.shape[:2]
+        for track in self._tracks:
+            if track.points is None or len(track.points) < 4:
+                track.quality = 0.0
+                continue
+            new_points, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, track.points, None)
+            good = status.ravel() == 1
+            track.quality = float(good.mean()) if len(good) else 0.0
+            if good.sum() < 4:
+                track.quality = 0.0
+                continue
+            old_good = track.points[good].reshape(-1, 2)
+            new_good = new_points[good].reshape(-1, 2)
+            dx, dy = np.median(new_good - old_good, axis=0)
+            x, y, w, h = track.box
+            x = int(min(max(x + dx, 0), frame_w - w))
+            y = int(min(max(y + dy, 0), frame_h - h))
+            track.box = (x, y, w, h)
+            track.points = new_good.reshape(-1, 1, 2)
+
+    def _redetect(self, gray, frame):
+        # Full frame every time: redetection is already infrequent, and an ROI search
+        # around the known faces would miss anyone entering elsewhere in the frame
+        boxes = [tuple(int(v) for v in box) for box in _detect_faces(gray, frame, full_scan=True)]
+        unmatched = list(self._tracks)
+        tracks = []
+        for box in boxes:
+            best, best_iou = None, self.iou_threshold
+            for track in unmatched:
+                iou = _box_iou(box, track.box)
+                if iou >= best_iou:
+                    best, best_iou = track, iou
+            if best is not None:
+                unmatched.remove(best)
+                best.box = box
+                track = best
+            else:
+                track = _Track(self._next_id, box)
+                self._next_id += 1
+            self._seed_points(gray, track)
+            tracks.append(track)
+        self._tracks = tracks
+
+    def _classify(self, frame, gray, with_age):
+        fingerprints = {}
+        for track in self._tracks:
+            fingerprint = crop_fingerprint(gray, track.box)
+            fingerprints[track.track_id] = fingerprint
+            cached = self.cache.get(track.track_id, fingerprint)
+            if cached is not None:
+                track.label, track.age = cached
+            else:
+                track.label, track.age = None, -1
+
+        new_tracks = [track for track in self._tracks if track.label is None]
+        if new_tracks:
+            try:
+                labels = _recognize_faces(gray, [track.box for track in new_tracks])
+                for track, label in zip(new_tracks, labels):
+                    track.label = int(label)
+            except Exception as e:
+                logging.warning(f"Error during face recognition prediction: {e}")
+                for track in new_tracks:
+                    track.label = -1
+
+        if with_age and age_model is not None:
+            unaged = [track for track in self._tracks
+                      if track.age == -1 and face_name(track.label) not in ("Error", "Unknown")]
+            if unaged:
+                ages = predict_age_batch([frame], [[track.box for track in unaged]])[0]
+                for track, age in zip(unaged, ages):
+                    track.age = age
+                    self.cache.set_age(track.track_id, age)
+
+        for track in new_tracks:
+            self.cache.put(track.track_id, fingerprints[track.track_id], track.label, track.age)
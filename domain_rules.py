@@ -0,0 +1,137 @@
+import json
+
+
+# Flag bits stored on trie nodes under the "" key (never a valid label)
+MATCH_SELF = 1
+MATCH_SUBDOMAINS = 2
+RULE_KINDS = ("exact", "wildcard", "suffix", "keyword")
+
+
+def normalize_host(host):
+    """Lowercase a hostname (or URL host part) and strip the port and trailing dot."""
+    host = host.strip().lower()
+    if "://" in host:
+        host = host.split("://", 1)[1]
+    host = host.split("/", 1)[0].split("@")[-1]
+    if not host.startswith("["):
+        host = host.split(":", 1)[0]
+    return host.rstrip(".")
+
+
+def parse_rule(rule, default_kind="exact"):
+    """Split a rule string into (kind, value).
+
+    "*.example.com" is a wildcard (subdomains only), ".example.com" or
+    "||example.com" a suffix (the domain and all its subdomains), and
+    "~casino" a keyword matched against whole labels or hyphen-separated
+    parts of labels. Anything else is a host of `default_kind`.
+    """
+    rule = rule.strip().lower()
+    if rule.startswith("~"):
+        return "keyword", rule[1:]
+    if rule.startswith("*."):
+        return "wildcard", normalize_host(rule[2:])
+    if rule.startswith("||"):
+        return "suffix", normalize_host(rule[2:].rstrip("^"))
+    if rule.startswith("."):
+        return "suffix", normalize_host(rule[1:])
+    return default_kind, normalize_host(rule)
+
+
+class DomainRules:
+    """Blocklist rules compiled into a reversed-label trie plus a keyword set.
+
+    Lookup walks the host's labels from the TLD inwards, so its cost depends
+    on the number of labels in the host, not the number of rules.
+    """
+
+    def __init__(self):
+        self.trie = {}
+        self.keywords = set()
+        self.count = 0
+
+    @classmethod
+    def compile(cls, rules, default_kind="exact"):
+        compiled = cls()
+        for rule in rules:
+            compiled.add(*parse_rule(rule, default_kind))
+        return compiled
+
+    def add(self, kind, value):
+        if not value:
+            return
+        if kind == "keyword":
+            self.keywords.add(value)
+        elif kind in ("exact", "wildcard", "suffix"):
+            node = self.trie
+            for label in reversed(value.split(".")):
+                node = node.setdefault(label, {})
+            flags = {"exact": MATCH_SELF, "wildcard": MATCH_SUBDOMAINS, "suffix": MATCH_SELF | MATCH_SUBDOMAINS}[kind]
+            node[""] = node.get("", 0) | flags
+        else:
+            raise ValueError(f"Unknown rule kind '{kind}', expected one of {RULE_KINDS}")
+        self.count += 1
+
+    def matches(self, host):
+        labels = normalize_host(host).split(".")
+        node = self.trie
+        for i in range(len(labels) - 1, -1, -1):
+            node = node.get(labels[i])
+            if node is None:
+                break
+            flags = node.get("", 0)
+            if flags & (MATCH_SELF if i == 0 else MATCH_SUBDOMAINS):
+                return True
+        if self.keywords:
+            for label in labels:
+                if label in self.keywords or ("-" in label and not self.keywords.isdisjoint(label.split("-"))):
+                    return True
+        return False
+
+    def __contains__(self, host):
+        return self.matches(host)
+
+    def __len__(self):
+        return self.count
+
+    def to_json(self):
+        """Serialise for the browser extension's JavaScript matcher (see JS_MATCHER)."""
+        return json.dumps({"trie": self.trie, "keywords": sorted(self.keywords)}, separators=(",", ":"))
+
+
+# Browser-side equivalent of DomainRules.matches; expects `const blockRules = <to_json()>;` before it
+JS_MATCHER = """
+const ruleTrie = blockRules.trie;
+const ruleKeywords = new Set(blockRules.keywords);
+const hasOwn = Object.prototype.hasOwnProperty;
+
+function hostFromUrl(url) {
+    try {
+        return new URL(url).hostname.toLowerCase().replace(/\\.$/, "");
+    } catch (e) {
+        return "";
+    }
+}
+
+// Walk the host's labels from the TLD inwards through the rule trie
+function isBlockedHost(host) {
+    const labels = host.split(".");
+    let node = ruleTrie;
+    for (let i = labels.length - 1; i >= 0; i--) {
+        if (!hasOwn.call(node, labels[i])) {
+            break;
+        }
+        node = node[labels[i]];
+        const flags = node[""] || 0;
+        if (flags & (i === 0 ? %(self)d : %(subdomains)d)) {
+            return true;
+        }
+    }
+    for (const label of labels) {
+        if (ruleKeywords.has(label) || label.split("-").some(token => ruleKeywords.has(token))) {
+            return true;
+        }
+    }
+    return false;
+}
+""" % {"self": MATCH_SELF, "subdomains": MATCH_SUBDOMAINS}
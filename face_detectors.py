@@ -0,0 +1,212 @@
+import os
+import cv2
+import json
+import time
+import logging
+import numpy as np
+
+
+CALIBRATION_FILENAME = "face_detector.json"
+LBP_CASCADE_FILENAME = "lbpcascade_frontalface_improved.xml"
+SSD_PROTOTXT_FILENAME = "deploy.prototxt"
+SSD_WEIGHTS_FILENAME = "res10_300x300_ssd_iter_140000.caffemodel"
+YUNET_MODEL_FILENAME = "face_detection_yunet_2023mar.onnx"
+BACKEND_NAMES = ("haar", "lbp", "ssd", "yunet")
+
+
+class CascadeFaceDetector:
+    """OpenCV cascade classifier (Haar or LBP features) run on a grayscale image."""
+
+    needs_color = False
+
+    def __init__(self, name, cascade_path, scale_factor=1.1, min_neighbors=5):
+        if not os.path.exists(cascade_path):
+            raise FileNotFoundError(cascade_path)
+        self.name = name
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        if self.cascade.empty():
+            raise ValueError(f"Could not load cascade {cascade_path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+
+    def detect(self, image, min_size):
+        faces = self.cascade.detectMultiScale(image, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors,
+                                              minSize=(min_size, min_size))
+        return [tuple(int(v) for v in face) for face in faces]
+
+
+class SsdFaceDetector:
+    """OpenCV DNN ResNet-10 SSD face detector (Caffe weights) on a BGR image."""
+
+    name = "ssd"
+    needs_color = True
+
+    def __init__(self, prototxt_path, weights_path, confidence=0.5):
+        for path in (prototxt_path, weights_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+        self.net = cv2.dnn.readNetFromCaffe(prototxt_path, weights_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.confidence = confidence
+
+    def detect(self, image, min_size):
+        h, w = image.shape[:2]
+        blob = cv2.dnn.blobFromImage(cv2.resize(image, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+        detections = self.net.forward()[0, 0]
+        faces = []
+        for detection in detections[detections[:, 2] >= self.confidence]:
+            x0, y0, x1, y1 = (detection[3:7] * np.array([w, h, w, h])).astype(int)
+            x0, y0 = max(x0, 0), max(y0, 0)
+            x1, y1 = min(x1, w), min(y1, h)
+            if x1 - x0 >= min_size and y1 - y0 >= min_size:
+                faces.append((int(x0), int(y0), int(x1 - x0), int(y1 - y0)))
+        return faces
+
+
+class YuNetFaceDetector:
+    """OpenCV FaceDetectorYN (YuNet ONNX model) on a BGR image."""
+
+    name = "yunet"
+    needs_color = True
+
+    def __init__(self, model_path, score_threshold=0.6):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(model_path)
+        if not hasattr(cv2, "FaceDetectorYN"):
+            raise ImportError("cv2.FaceDetectorYN requires OpenCV 4.5.4 or newer")
+        self.model = cv2.FaceDetectorYN.create(model_path, "", (320, 320), score_threshold)
+        self._input_size = (320, 320)
+
+    def detect(self, image, min_size):
+        h, w = image.shape[:2]
+        if (w, h) != self._input_size:
+            self.model.setInputSize((w, h))
+            self._input_size = (w, h)
+        _, detections = self.model.detect(image)
+        if detections is None:
+            return []
+        faces = []
+        for detection in detections:
+            x, y, fw, fh = (int(v) for v in detection[:4])
+            if fw >= min_size and fh >= min_size:
+                faces.append((max(x, 0), max(y, 0), fw, fh))
+        return faces
+
+
+def _lbp_cascade_path(models_dir):
+    local_path = os.path.join(models_dir, LBP_CASCADE_FILENAME)
+    if os.path.exists(local_path):
+        return local_path
+    # Some OpenCV builds ship LBP cascades next to the Haar ones
+    return os.path.join(os.path.dirname(os.path.normpath(cv2.data.haarcascades)), "lbpcascades", LBP_CASCADE_FILENAME)
+
+
+def create_face_detector(name, models_dir):
+    """Instantiate a face detector backend by name; raises FileNotFoundError if its model files are missing."""
+    if name == "haar":
+        return CascadeFaceDetector("haar", cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    if name == "lbp":
+        return CascadeFaceDetector("lbp", _lbp_cascade_path(models_dir))
+    if name == "ssd":
+        return SsdFaceDetector(os.path.join(models_dir, SSD_PROTOTXT_FILENAME),
+                               os.path.join(models_dir, SSD_WEIGHTS_FILENAME))
+    if name == "yunet":
+        return YuNetFaceDetector(os.path.join(models_dir, YUNET_MODEL_FILENAME))
+    raise ValueError(f"Unknown face detector backend '{name}', expected one of {BACKEND_NAMES}")
+
+
+def calibrated_backend(models_dir):
+    """Backend chosen by the last calibration run, or None."""
+    try:
+        with open(os.path.join(models_dir, CALIBRATION_FILENAME), "r") as f:
+            return json.load(f).get("backend")
+    except (OSError, ValueError):
+        return None
+
+
+def create_default_detector(models_dir, backend="auto"):
+    """Open the requested backend; "auto" uses the calibrated choice and falls back to Haar."""
+    name = calibrated_backend(models_dir) if backend == "auto" else backend
+    if name and name != "haar":
+        try:
+            return create_face_detector(name, models_dir)
+        except Exception as e:
+            logging.warning(f"Face detector backend '{name}' unavailable ({e}); falling back to Haar.")
+    return create_face_detector("haar", models_dir)
+
+
+def _load_samples(sample_dir, max_images):
+    paths = []
+    for root, _, files in os.walk(sample_dir):
+        paths.extend(os.path.join(root, name) for name in sorted(files))
+    samples = []
+    for path in sorted(paths)[:max_images]:
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        # Dataset images are tight face crops; pad them so every detector sees a face in context
+        h, w = img.shape[:2]
+        img = cv2.copyMakeBorder(img, h // 2, h // 2, w // 2, w // 2, cv2.BORDER_CONSTANT, value=(0, 0, 0))
+        samples.append(img)
+    return samples
+
+
+def calibrate(models_dir, sample_dir, recall_target=0.9, max_images=100, min_size=60):
+    """Benchmark every available backend on sample face images and pick the fastest that meets the recall target.
+
+    Recall is the fraction of sample images in which at least one face is found.
+    The choice is saved to models/face_detector.json and used by "auto" mode.
+    """
+    samples = _load_samples(sample_dir, max_images)
+    if not samples:
+        raise ValueError(f"No readable sample images in {sample_dir}")
+
+    results = {}
+    for name in BACKEND_NAMES:
+        try:
+            face_detector = create_face_detector(name, models_dir)
+        except Exception as e:
+            results[name] = {"available": False, "error": str(e)}
+            continue
+        found = 0
+        started = time.perf_counter()
+        for img in samples:
+            image = img if face_detector.needs_color else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            if face_detector.detect(image, min_size):
+                found += 1
+        elapsed = time.perf_counter() - started
+        results[name] = {"available": True, "recall": found / len(samples),
+                         "ms_per_image": 1000.0 * elapsed / len(samples)}
+
+    available = {name: r for name, r in results.items() if r["available"]}
+    passing = {name: r for name, r in available.items() if r["recall"] >= recall_target}
+    if passing:
+        best = min(passing, key=lambda name: passing[name]["ms_per_image"])
+    else:
+        best = max(available, key=lambda name: available[name]["recall"])
+    report = {"backend": best, "recall_target": recall_target, "images": len(samples), "results": results}
+    with open(os.path.join(models_dir, CALIBRATION_FILENAME), "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser = argparse.ArgumentParser(description="Pick the fastest face detector that meets a recall target.")
+    parser.add_argument("--models-dir", default=os.path.join(BASE_DIR, 'models'))
+    parser.add_argument("--samples", default=os.path.join(BASE_DIR, 'data', 'family_dataset'),
+                        help="Folder of face images (default: data/family_dataset)")
+    parser.add_argument("--recall", type=float, default=0.9, help="Minimum recall to accept a backend")
+    parser.add_argument("--max-images", type=int, default=100)
+    args = parser.parse_args()
+
+    report = calibrate(args.models_dir, args.samples, args.recall, args.max_images)
+    for name, result in report["results"].items():
+        if result["available"]:
+            print(f"  {name:<6} recall {result['recall']:.2f}  {result['ms_per_image']:.1f} ms/image")
+        else:
+            print(f"  {name:<6} unavailable: {result['error']}")
+    print(f"✅ Selected backend: {report['backend']}")
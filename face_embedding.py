@@ -0,0 +1,108 @@
+import os
+import copy
+import pickle
+import numpy as np
+
+
+EMBEDDING_DIM = 128
+# Components whose variance is below this fraction of the largest are dropped before whitening
+MIN_RELATIVE_VARIANCE = 1e-5
+PROJECTION_FILENAME = "face_recognition_model.pkl"
+INDEX_FILENAME = "face_index.pkl"
+LABEL_MAP_FILENAME = "label_map.pkl"
+
+
+def fit_projection(samples, n_components=EMBEDDING_DIM):
+    """Fit an eigenface (whitened PCA) projection on flattened 100x100 grayscale faces."""
+    # scikit-learn is imported on first use to keep it off the GUI startup path
+    from sklearn.decomposition import PCA
+    samples = samples.astype(np.float32)
+    # Centred data has rank n_samples - 1; a component beyond that carries only noise,
+    # and whitening would scale that noise up until it dominates neighbour distances
+    n_components = max(1, min(n_components, samples.shape[0] - 1, samples.shape[1]))
+    projection = PCA(n_components=n_components, whiten=True, svd_solver="randomized", random_state=0)
+    projection.fit(samples)
+    variance = projection.explained_variance_
+    kept = int(np.count_nonzero(variance > MIN_RELATIVE_VARIANCE * variance[0])) if len(variance) else 0
+    if 0 < kept < n_components:
+        projection = PCA(n_components=kept, whiten=True, svd_solver="randomized", random_state=0)
+        projection.fit(samples)
+    # Round the basis to the float16 precision it is stored with, so index embeddings
+    # computed now match the ones computed after the model is reloaded
+    projection.components_ = projection.components_.astype(np.float16).astype(np.float32)
+    projection.mean_ = projection.mean_.astype(np.float16).astype(np.float32)
+    return projection
+
+
+def embed(projection, samples):
+    return projection.transform(np.asarray(samples, dtype=np.float32)).astype(np.float32)
+
+
+def build_index(embeddings, labels, n_neighbors=3):
+    """Build a ball-tree index over face embeddings with their integer labels."""
+    from sklearn.neighbors import BallTree
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    return {
+        "tree": BallTree(embeddings),
+        "labels": np.asarray(labels, dtype=np.int32),
+        "n_neighbors": n_neighbors,
+    }
+
+
+def index_embeddings(index):
+    return np.asarray(index["tree"].get_arrays()[0], dtype=np.float32)
+
+
+def query_index(index, embeddings):
+    """Majority vote over the nearest neighbours of each embedding; returns one label per row."""
+    labels = index["labels"]
+    k = max(1, min(index["n_neighbors"], len(labels)))
+    _, neighbours = index["tree"].query(np.asarray(embeddings, dtype=np.float32), k=k)
+    neighbour_labels = labels[neighbours]
+    return np.array([np.bincount(row).argmax() for row in neighbour_labels], dtype=np.int32)
+
+
+def _dump_atomic(obj, path):
+    # Write beside the target and rename so a concurrent reader never sees a partial pickle
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f)
+    os.replace(tmp_path, path)
+
+
+def _compact_projection(projection):
+    # The k x 10000 basis dominates the file and float16 halves it (fit_projection already
+    # rounded it to that precision, so this is lossless). It stays larger than the uint8 raw-pixel model it
+    # replaced until about 256 training images (2 bytes x k components vs 1 byte x n images)
+    compact = copy.copy(projection)
+    compact.components_ = projection.components_.astype(np.float16)
+    compact.mean_ = projection.mean_.astype(np.float16)
+    return compact
+
+
+def _expand_projection(projection):
+    # Legacy raw-pixel models (KNN classifiers) have no basis to expand
+    if getattr(projection, "components_", None) is not None and projection.components_.dtype == np.float16:
+        projection.components_ = projection.components_.astype(np.float32)
+        projection.mean_ = projection.mean_.astype(np.float32)
+    return projection
+
+
+def save_model(models_dir, projection, index, label_map):
+    _dump_atomic(_compact_projection(projection), os.path.join(models_dir, PROJECTION_FILENAME))
+    _dump_atomic(index, os.path.join(models_dir, INDEX_FILENAME))
+    _dump_atomic(label_map, os.path.join(models_dir, LABEL_MAP_FILENAME))
+
+
+def load_model(models_dir):
+    """Load (projection, index, label_map); index is None for legacy raw-pixel models."""
+    with open(os.path.join(models_dir, PROJECTION_FILENAME), "rb") as f:
+        projection = _expand_projection(pickle.load(f))
+    with open(os.path.join(models_dir, LABEL_MAP_FILENAME), "rb") as f:
+        label_map = pickle.load(f)
+    index = None
+    index_path = os.path.join(models_dir, INDEX_FILENAME)
+    if os.path.exists(index_path):
+        with open(index_path, "rb") as f:
+            index = pickle.load(f)
+    return projection, index, label_map
@@ -0,0 +1,149 @@
+import os
+import cv2
+import json
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+
+CACHE_DIRNAME = "feature_cache"
+FEATURES_FILENAME = "features.npy"
+MANIFEST_FILENAME = "manifest.json"
+FACE_SIZE = (100, 100)
+MANIFEST_VERSION = 1
+
+
+def preprocess_image(img_path):
+    """Decode one dataset image into a flattened 100x100 grayscale vector, or None if unreadable."""
+    img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return None
+    return cv2.resize(img, FACE_SIZE).flatten()
+
+
+def decode_images(img_paths, max_workers=None, chunk_size=32):
+    """Decode and preprocess images concurrently into one preallocated uint8 matrix.
+
+    OpenCV releases the GIL while decoding and resizing, so a thread pool scales
+    with core count. Returns (features, ok) where ok[i] is False for unreadable files.
+    """
+    features = np.empty((len(img_paths), FACE_SIZE[0] * FACE_SIZE[1]), dtype=np.uint8)
+    ok = np.zeros(len(img_paths), dtype=bool)
+
+    def decode_chunk(start):
+        for i in range(start, min(start + chunk_size, len(img_paths))):
+            vector = preprocess_image(img_paths[i])
+            if vector is not None:
+                features[i] = vector
+                ok[i] = True
+
+    if len(img_paths) <= chunk_size:
+        decode_chunk(0)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            list(executor.map(decode_chunk, range(0, len(img_paths), chunk_size)))
+    return features, ok
+
+
+def scan_dataset(dataset_path):
+    """List (relative path, mtime_ns, size) for every image under each person folder, in stable order."""
+    files = []
+    for person in sorted(os.listdir(dataset_path)):
+        person_path = os.path.join(dataset_path, person)
+        if not os.path.isdir(person_path):
+            continue
+        for img_name in sorted(os.listdir(person_path)):
+            img_path = os.path.join(person_path, img_name)
+            try:
+                st = os.stat(img_path)
+            except OSError:
+                continue
+            if os.path.isfile(img_path):
+                files.append((os.path.join(person, img_name), st.st_mtime_ns, st.st_size))
+    return files
+
+
+def _load_cache(cache_dir):
+    manifest_path = os.path.join(cache_dir, MANIFEST_FILENAME)
+    features_path = os.path.join(cache_dir, FEATURES_FILENAME)
+    try:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION:
+            return {}, None
+        features = np.load(features_path, mmap_mode="r")
+    except (OSError, ValueError):
+        return {}, None
+    return manifest.get("entries", {}), features
+
+
+def _save_cache(cache_dir, entries, features):
+    os.makedirs(cache_dir, exist_ok=True)
+    features_path = os.path.join(cache_dir, FEATURES_FILENAME)
+    manifest_path = os.path.join(cache_dir, MANIFEST_FILENAME)
+    # Write both files beside their targets and rename, features first, so the
+    # manifest never points at rows that are not on disk yet
+    with open(features_path + ".tmp", "wb") as f:
+        np.save(f, features)
+    os.replace(features_path + ".tmp", features_path)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump({"version": MANIFEST_VERSION, "entries": entries}, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def load_features(dataset_path, cache_dir):
+    """Return (features, relative_paths) for every readable image in the dataset.
+
+    Images whose path, mtime and size match the manifest are served from the
+    memory-mapped feature file; only new or changed images are decoded. When
+    nothing changed the memory map itself is returned without copying.
+    """
+    files = scan_dataset(dataset_path)
+    entries, cached = _load_cache(cache_dir)
+    if cached is not None and any(entry["row"] is not None and entry["row"] >= len(cached)
+                                  for entry in entries.values()):
+        entries, cached = {}, None
+
+    rows = []
+    misses = []
+    new_entries = {}
+    for rel_path, mtime_ns, size in files:
+        entry = entries.get(rel_path)
+        if entry is not None and entry["mtime_ns"] == mtime_ns and entry["size"] == size:
+            new_entries[rel_path] = entry
+            if entry["row"] is not None:
+                rows.append((rel_path, entry["row"]))
+        else:
+            misses.append((rel_path, mtime_ns, size))
+
+    unchanged = not misses and len(new_entries) == len(entries)
+    if unchanged and cached is not None and [row for _, row in rows] == list(range(len(cached))):
+        return cached, [rel_path for rel_path, _ in rows]
+
+    decoded_features, decoded_ok = decode_images(
+        [os.path.join(dataset_path, rel_path) for rel_path, _, _ in misses])
+    decoded = {}
+    for i, (rel_path, mtime_ns, size) in enumerate(misses):
+        if decoded_ok[i]:
+            decoded[rel_path] = i
+        else:
+            print(f"Warning: Could not read image {rel_path}. Skipping.")
+        new_entries[rel_path] = {"mtime_ns": mtime_ns, "size": size, "row": None}
+
+    # Rebuild the feature matrix in scan order so the next unchanged run is a pure mmap load
+    order = [rel_path for rel_path, _, _ in files
+             if rel_path in decoded or (new_entries[rel_path]["row"] is not None)]
+    features = np.empty((len(order), FACE_SIZE[0] * FACE_SIZE[1]), dtype=np.uint8)
+    for row, rel_path in enumerate(order):
+        if rel_path in decoded:
+            features[row] = decoded_features[decoded[rel_path]]
+        else:
+            features[row] = cached[new_entries[rel_path]["row"]]
+        new_entries[rel_path] = dict(new_entries[rel_path], row=row)
+
+    cached = None # Release the old memory map before its file is replaced
+    try:
+        _save_cache(cache_dir, new_entries, features)
+    except OSError as e:
+        print(f"Warning: Could not write feature cache: {e}")
+    print(f"   Feature cache: {len(rows)} cached, {len(misses)} decoded.")
+    return features, order
@@ -0,0 +1,314 @@
+import os
+import cv2
+import time
+import logging
+import numpy as np
+import urllib.request
+from urllib.parse import urlparse
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+STREAM_SCHEMES = ("rtsp", "rtsps", "http", "https", "rtmp", "udp", "tcp")
+
+
+class FrameSource:
+    """Common interface for anything that yields BGR frames.
+
+    Mirrors the cv2.VideoCapture calls the app already uses (isOpened/read/release)
+    and adds resolution and frame-rate negotiation: `resolution` and `fps` report
+    what the source actually delivers after open().
+    """
+
+    def __init__(self, width=None, height=None, fps=None):
+        self.requested_width = width
+        self.requested_height = height
+        self.requested_fps = fps
+        self.resolution = None
+        self.fps = None
+        self._last_read = None
+
+    def open(self):
+        raise NotImplementedError
+
+    def isOpened(self):
+        raise NotImplementedError
+
+    def _read_frame(self):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+    def grab(self):
+        """Advance past one frame without keeping it, e.g. to drop a stale buffered frame."""
+        ret, _ = self._read_frame()
+        return ret
+
+    def read(self):
+        ret, frame = self._read_frame()
+        if ret:
+            frame = self._fit(frame)
+        return ret, frame
+
+    def _fitted_size(self, width, height):
+        """Largest size within the requested one that keeps the source's aspect ratio.
+
+        Frames are only ever downscaled, and never stretched: a 16:9 camera asked
+        for 640x480 delivers 640x360, so faces keep their proportions for
+        recognition and age inference.
+        """
+        if not (self.requested_width and self.requested_height) or not (width and height):
+            return width, height
+        scale = min(self.requested_width / width, self.requested_height / height, 1.0)
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def _fit(self, frame):
+        h, w = frame.shape[:2]
+        size = self._fitted_size(w, h)
+        if size != (w, h):
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return frame
+
+    def _pace(self):
+        # Replay sources are throttled to the requested rate; without one they run flat out
+        if not self.requested_fps:
+            return
+        now = time.monotonic()
+        if self._last_read is not None:
+            delay = 1.0 / self.requested_fps - (now - self._last_read)
+            if delay > 0:
+                time.sleep(delay)
+                now = time.monotonic()
+        self._last_read = now
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class _CaptureSource(FrameSource):
+    """Shared cv2.VideoCapture handling for devices, files and streams."""
+
+    def __init__(self, target, width=None, height=None, fps=None, api=cv2.CAP_ANY):
+        super().__init__(width, height, fps)
+        self.target = target
+        self.api = api
+        self._cap = None
+
+    def _negotiate(self):
+        # Ask the driver for the requested mode, then report what it actually granted
+        if self.requested_width and self.requested_height:
+            self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.requested_width)
+            self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.requested_height)
+        if self.requested_fps:
+            self._cap.set(cv2.CAP_PROP_FPS, self.requested_fps)
+        granted = (int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        if self.requested_width and granted != (self.requested_width, self.requested_height):
+            logging.info(f"Source granted {granted[0]}x{granted[1]} instead of the requested "
+                         f"{self.requested_width}x{self.requested_height}")
+        self.resolution = self._fitted_size(*granted)
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or self.requested_fps
+
+    def open(self):
+        self._cap = cv2.VideoCapture(self.target, self.api)
+        if not self._cap.isOpened():
+            return False
+        self._negotiate()
+        return True
+
+    def isOpened(self):
+        return self._cap is not None and self._cap.isOpened()
+
+    def _read_frame(self):
+        return self._cap.read()
+
+    def grab(self):
+        return self._cap.grab()
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+class DeviceSource(_CaptureSource):
+    """Local camera by device index. Requesting a lower resolution cuts decode and colour-conversion cost."""
+
+    def __init__(self, index=0, width=None, height=None, fps=None):
+        super().__init__(index, width, height, fps)
+
+
+class VideoFileSource(_CaptureSource):
+    """Recorded video file, optionally looped and paced to the requested FPS."""
+
+    def __init__(self, path, width=None, height=None, fps=None, loop=False):
+        super().__init__(path, width, height, fps)
+        self.loop = loop
+
+    def _negotiate(self):
+        native_size = (int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self.resolution = self._fitted_size(*native_size)
+        self.fps = self.requested_fps or self._cap.get(cv2.CAP_PROP_FPS)
+
+    def _read_frame(self):
+        self._pace()
+        ret, frame = self._cap.read()
+        if not ret and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._cap.read()
+        return ret, frame
+
+
+class ImageFolderSource(FrameSource):
+    """Directory of still images replayed in name order, optionally looped and paced."""
+
+    def __init__(self, path, width=None, height=None, fps=None, loop=False):
+        super().__init__(width, height, fps)
+        self.path = path
+        self.loop = loop
+        self._files = None
+        self._position = 0
+
+    def open(self):
+        if not os.path.isdir(self.path):
+            return False
+        self._files = [os.path.join(self.path, name) for name in sorted(os.listdir(self.path))
+                       if name.lower().endswith(IMAGE_EXTENSIONS)]
+        self._position = 0
+        if not self._files:
+            return False
+        first = cv2.imread(self._files[0])
+        if first is not None:
+            self.resolution = self._fitted_size(first.shape[1], first.shape[0])
+        else:
+            self.resolution = (self.requested_width, self.requested_height) if self.requested_width else None
+        self.fps = self.requested_fps
+        return True
+
+    def isOpened(self):
+        return self._files is not None
+
+    def _read_frame(self):
+        self._pace()
+        while self._files:
+            if self._position >= len(self._files):
+                if not self.loop:
+                    return False, None
+                self._position = 0
+            path = self._files[self._position]
+            self._position += 1
+            frame = cv2.imread(path)
+            if frame is not None:
+                return True, frame
+            logging.warning(f"Could not read image {path}. Skipping.")
+        return False, None
+
+    def release(self):
+        self._files = None
+
+
+class _MjpegReader:
+    """Minimal multipart MJPEG-over-HTTP reader: extracts JPEGs by their SOI/EOI markers."""
+
+    def __init__(self, url, timeout=5.0):
+        self._response = urllib.request.urlopen(url, timeout=timeout)
+        self._buffer = bytearray()
+
+    def read(self):
+        while True:
+            start = self._buffer.find(b"\xff\xd8")
+            end = self._buffer.find(b"\xff\xd9", start + 2) if start != -1 else -1
+            if start != -1 and end != -1:
+                jpeg = bytes(self._buffer[start:end + 2])
+                del self._buffer[:end + 2]
+                frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                return frame is not None, frame
+            chunk = self._response.read(16384)
+            if not chunk:
+                return False, None
+            self._buffer.extend(chunk)
+
+    def close(self):
+        self._response.close()
+
+
+class StreamSource(FrameSource):
+    """Network stream (RTSP/HTTP/...) through OpenCV, with a pure-Python MJPEG fallback and reconnects."""
+
+    def __init__(self, url, width=None, height=None, fps=None, reconnect_attempts=3):
+        super().__init__(width, height, fps)
+        self.url = url
+        self.reconnect_attempts = reconnect_attempts
+        self._capture = None
+        self._mjpeg = None
+
+    def open(self):
+        self.release()
+        capture = _CaptureSource(self.url, self.requested_width, self.requested_height, self.requested_fps)
+        if capture.open():
+            # Keep the driver buffer short so we always decode the newest frame
+            capture._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            self._capture = capture
+            self.resolution, self.fps = capture.resolution, capture.fps
+            return True
+        if urlparse(self.url).scheme in ("http", "https"):
+            try:
+                self._mjpeg = _MjpegReader(self.url)
+            except OSError as e:
+                logging.warning(f"Could not open stream {self.url}: {e}")
+                return False
+            self.resolution = (self.requested_width, self.requested_height) if self.requested_width else None
+            self.fps = self.requested_fps
+            return True
+        return False
+
+    def isOpened(self):
+        return self._capture is not None or self._mjpeg is not None
+
+    def _read_frame(self):
+        for attempt in range(self.reconnect_attempts + 1):
+            if self._capture is not None:
+                ret, frame = self._capture.read()
+            elif self._mjpeg is not None:
+                try:
+                    ret, frame = self._mjpeg.read()
+                except OSError:
+                    ret, frame = False, None
+            else:
+                ret, frame = False, None
+            if ret:
+                return ret, frame
+            if attempt < self.reconnect_attempts:
+                logging.warning(f"Stream {self.url} read failed, reconnecting ({attempt + 1}/{self.reconnect_attempts})")
+                time.sleep(min(2 ** attempt, 5))
+                self.open()
+        return False, None
+
+    def release(self):
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+        if self._mjpeg is not None:
+            self._mjpeg.close()
+            self._mjpeg = None
+
+
+def create_frame_source(spec, width=None, height=None, fps=None, loop=False):
+    """Build a FrameSource from a device index, video path, image folder or stream URL (not yet opened)."""
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return DeviceSource(int(spec), width, height, fps)
+    if urlparse(spec).scheme in STREAM_SCHEMES:
+        return StreamSource(spec, width, height, fps)
+    if os.path.isdir(spec):
+        return ImageFolderSource(spec, width, height, fps, loop=loop)
+    return VideoFileSource(spec, width, height, fps, loop=loop)
+
+
+def open_frame_source(spec, width=None, height=None, fps=None, loop=False):
+    """Create and open a FrameSource; check isOpened() on the result."""
+    source = create_frame_source(spec, width, height, fps, loop)
+    source.open()
+    return source
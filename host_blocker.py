@@ -4,6 +4,9 @@ import sys # To check if running as admin/root
 import subprocess
 import socket
 import tempfile
+from . import hosts_file
+from . import domain_rules
+from . import blocklist_importer
 
 # List of websites to block
 blocked_sites = [
@@ -37,6 +40,53 @@ blocked_sites = [
     "m.facebook.com", "fb.com", "facebook.net", "www.facebook.net"
 ]
 
+_compiled_rules = None
+
+def imported_rules():
+    """Rules from the compiled blocklist artifact (see blocklist_importer), streamed; empty if none was imported."""
+    path = blocklist_importer.artifact_path()
+    if path:
+        yield from blocklist_importer.load_blocklist(path)
+
+def compiled_rules(refresh=False):
+    """blocked_sites plus any imported blocklist compiled into a DomainRules trie.
+
+    Plain blocked_sites entries also cover their subdomains.
+    """
+    global _compiled_rules
+    if _compiled_rules is None or refresh:
+        rules = domain_rules.DomainRules.compile(blocked_sites, default_kind="suffix")
+        for rule in imported_rules():
+            rules.add(*domain_rules.parse_rule(rule))
+        _compiled_rules = rules
+    return _compiled_rules
+
+def hosts_entries():
+    """Hostnames to redirect in the hosts file, which only supports exact names.
+
+    blocked_sites entries get a www. variant; imported exact and suffix rules
+    contribute their domain (plus www. for suffixes). Wildcard and keyword rules
+    cannot be expressed in a hosts file and are left to the browser extension.
+    """
+    entries = dict.fromkeys(blocked_sites)
+    for site in blocked_sites:
+        # If site doesn't start with www. and doesn't already have a www. variant in the list
+        if not site.startswith("www."):
+            entries.setdefault(f"www.{site}")
+    for rule in imported_rules():
+        kind, domain = domain_rules.parse_rule(rule)
+        if kind == "exact":
+            entries.setdefault(domain)
+        elif kind == "suffix":
+            entries.setdefault(domain)
+            if not domain.startswith("www."):
+                entries.setdefault(f"www.{domain}")
+    return list(entries)
+
+def is_blocked(host):
+    """Check a hostname or URL against the blocklist in O(number of labels)."""
+    return compiled_rules().matches(host)
+
 # --- OS Detection and Hosts File Path ---
 def get_hosts_path():
     system = platform.system().lower()
@@ -59,8 +109,8 @@ except OSError as e:
     hosts_path = None
 
 redirect_ip = "127.0.0.1"
-block_marker_start = "# AI-Child-Protection Block Start"
-block_marker_end = "# AI-Child-Protection Block End"
+block_marker_start = hosts_file.BLOCK_MARKER_START
+block_marker_end = hosts_file.BLOCK_MARKER_END
 
 def is_admin():
     """Check if the script is running with admin/root privileges."""
@@ -143,60 +193,17 @@ def block_sites():
         return "Error: Permission Denied. Run as Administrator/root."
 
     try:
-        # First, make sure all blocked sites have both with www and without www variants
-        complete_blocked_sites = []
-        for site in blocked_sites:
-            complete_blocked_sites.append(site)
-            # If site doesn't start with www. and doesn't already have a www. variant in the list
-            if not site.startswith("www.") and f"www.{site}" not in blocked_sites:
-                complete_blocked_sites.append(f"www.{site}")
-
-        with open(hosts_path, 'r+') as file:
-            content = file.read()
-            lines_to_add = []
-            needs_update = False
+        # Parse once, diff the managed section as sets, and replace the file atomically
+        changed, added, removed = hosts_file.apply_block(hosts_path, hosts_entries(), redirect_ip,
+                                                         block_marker_start, block_marker_end)
+        if not changed:
+            return "✅ Sites already blocked."
 
-            # Check if block marker exists, if not, add it
-            if block_marker_start not in content:
-                lines_to_add.append(f"\n{block_marker_start}\n")
-                needs_update = True
-
-            for site in complete_blocked_sites:
-                entry = f"{redirect_ip} {site}"
-                # Check if site is already blocked *within* our markers or generally
-                if entry not in content:
-                     lines_to_add.append(f"{entry}\n")
-                     needs_update = True
-
-            # Check if end marker exists, if not, add it
-            if block_marker_end not in content:
-                 lines_to_add.append(f"{block_marker_end}\n")
-                 needs_update = True
-
-            if needs_update:
-                # Find start marker or append to end
-                if block_marker_start in content:
-                     # Insert new entries just after the start marker
-                    pos = content.find(block_marker_start) + len(block_marker_start)
-                    file.seek(pos)
-                    remaining_content = file.read() # Read rest of file
-                    file.seek(pos) # Go back to insert point
-                    file.write("\n" + "".join(lines_to_add).strip() + "\n") # Write new lines
-                    file.write(remaining_content) # Write back the rest
-                    file.truncate() # Remove potential trailing content if insert was shorter
-                else:
-                    # If markers somehow weren't added, append everything to the end
-                    file.seek(0, os.SEEK_END) # Go to end of file
-                    if not content.endswith('\n'): file.write('\n') # Ensure newline
-                    file.write("\n".join(lines_to_add))
+        # Flush DNS cache to ensure changes take effect immediately
+        dns_result = flush_dns_cache()
+        browser_instructions = clear_browser_dns_cache()
 
-                # Flush DNS cache to ensure changes take effect immediately
-                dns_result = flush_dns_cache()
-                browser_instructions = clear_browser_dns_cache()
-                
-                return f"✅ Sites blocked/updated successfully! {dns_result}"
-            else:
-                return "✅ Sites already blocked."
+        return f"✅ Sites blocked/updated successfully ({len(added)} added, {len(removed)} removed)! {dns_result}"
 
     except PermissionError:
         return "Error: Permission Denied. Run as Administrator/root."
@@ -211,26 +218,8 @@ def unblock_sites():
         return "Error: Permission Denied. Run as Administrator/root."
 
     try:
-        with open(hosts_path, 'r') as file:
-            lines = file.readlines()
-
-        with open(hosts_path, 'w') as file:
-            in_block_section = False
-            for line in lines:
-                if block_marker_start in line:
-                    in_block_section = True
-                    # Optionally keep the start marker line itself, or remove it too
-                    # file.write(line) # Uncomment to keep marker
-                    continue # Skip writing this line
-                elif block_marker_end in line:
-                    in_block_section = False
-                    # Optionally keep the end marker line itself
-                    # file.write(line) # Uncomment to keep marker
-                    continue # Skip writing this line
-
-                # Write line only if it's outside our block section
-                if not in_block_section:
-                    file.write(line)
+        if not hosts_file.remove_block(hosts_path, block_marker_start, block_marker_end):
+            return "✅ No block section found; nothing to unblock."
 
         # Flush DNS cache to ensure changes take effect immediately
         dns_result = flush_dns_cache()
@@ -0,0 +1,162 @@
+import os
+import errno
+import tempfile
+
+
+BLOCK_MARKER_START = "# AI-Child-Protection Block Start"
+BLOCK_MARKER_END = "# AI-Child-Protection Block End"
+ENCODING = "utf-8"
+
+
+class HostsFile:
+    """A hosts file parsed once into lines plus the location of our managed section.
+
+    `start` and `end` are the line indices of the block markers (None when
+    there is no well-formed section); `managed` maps each hostname inside the
+    section to the IP it is redirected to.
+    """
+
+    def __init__(self, lines, start=None, end=None, managed=None, stray_markers=()):
+        self.lines = lines
+        self.start = start
+        self.end = end
+        self.managed = managed or {}
+        self.stray_markers = list(stray_markers)
+
+    @classmethod
+    def parse(cls, text, marker_start=BLOCK_MARKER_START, marker_end=BLOCK_MARKER_END):
+        lines = text.splitlines()
+        start = end = None
+        managed = {}
+        stray = []
+        for i, line in enumerate(lines):
+            stripped = line.strip()
+            if stripped == marker_start:
+                if start is None:
+                    start = i
+                else:
+                    stray.append(i)
+            elif stripped == marker_end:
+                if start is not None and end is None:
+                    end = i
+                else:
+                    stray.append(i)
+            elif start is not None and end is None:
+                parts = stripped.split("#", 1)[0].split()
+                for host in parts[1:]:
+                    managed[host.lower()] = parts[0]
+        if start is not None and end is None:
+            # Start marker without an end: keep what follows as ordinary content
+            stray.append(start)
+            start = None
+            managed = {}
+        return cls(lines, start, end, managed, stray)
+
+    def has_section(self):
+        return self.start is not None
+
+    def render(self, entries=None, ip="127.0.0.1", marker_start=BLOCK_MARKER_START, marker_end=BLOCK_MARKER_END):
+        """Return the file text with the managed section replaced by `entries` (removed when None)."""
+        drop = set(self.stray_markers)
+        if self.has_section():
+            drop.update(range(self.start, self.end + 1))
+        insert_at = self.start if self.has_section() else len(self.lines)
+        before = [line for i, line in enumerate(self.lines[:insert_at]) if i not in drop]
+        after = [line for i, line in enumerate(self.lines[insert_at:], insert_at) if i not in drop]
+        section = []
+        if entries is not None:
+            if before and before[-1].strip():
+                section.append("")
+            section.append(marker_start)
+            section.extend(f"{ip} {host}" for host in entries)
+            section.append(marker_end)
+        elif before and after and not before[-1].strip() and not after[0].strip():
+            after = after[1:] # Don't leave a double blank line where the section was
+        return "\n".join(before + section + after) + "\n"
+
+
+def read_hosts(path, marker_start=BLOCK_MARKER_START, marker_end=BLOCK_MARKER_END):
+    with open(path, "r", encoding=ENCODING, errors="surrogateescape") as f:
+        return HostsFile.parse(f.read(), marker_start, marker_end)
+
+
+def write_atomic(path, text):
+    """Replace `path` with `text` so readers see either the old or the new file, never a partial one.
+
+    Writes a temp file in the same directory, fsyncs it, copies the original
+    mode/ownership and renames it over the target. Where the target cannot be
+    replaced (e.g. a bind-mounted /etc/hosts in a container) it falls back to
+    an in-place rewrite followed by fsync.
+    """
+    path = os.path.realpath(path)
+    directory = os.path.dirname(path)
+    try:
+        original = os.stat(path)
+    except FileNotFoundError:
+        original = None
+
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".hosts.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding=ENCODING, errors="surrogateescape") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if original is not None:
+            os.chmod(temp_path, original.st_mode & 0o7777)
+            if hasattr(os, "chown"):
+                try:
+                    os.chown(temp_path, original.st_uid, original.st_gid)
+                except PermissionError:
+                    pass
+        try:
+            os.replace(temp_path, path)
+        except OSError as e:
+            if e.errno not in (errno.EBUSY, errno.EXDEV, errno.EACCES, errno.EPERM):
+                raise
+            os.remove(temp_path)
+            with open(path, "w", encoding=ENCODING, errors="surrogateescape") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            return
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    if hasattr(os, "O_DIRECTORY"):
+        # Persist the rename itself
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def apply_block(path, sites, ip="127.0.0.1", marker_start=BLOCK_MARKER_START, marker_end=BLOCK_MARKER_END):
+    """Make the managed section redirect exactly `sites` to `ip`.
+
+    The file is parsed once and the desired set is diffed against the current
+    section; nothing is written when they already match. Returns
+    (changed, added, removed) where added/removed are sets of hostnames.
+    """
+    hosts = read_hosts(path, marker_start, marker_end)
+    desired = list(dict.fromkeys(site.lower() for site in sites))
+    desired_set = set(desired)
+    current = hosts.managed
+    added = desired_set - current.keys()
+    removed = current.keys() - desired_set
+    redirected_elsewhere = any(current[host] != ip for host in desired_set & current.keys())
+    if hosts.has_section() and not added and not removed and not redirected_elsewhere and not hosts.stray_markers:
+        return False, added, removed
+    write_atomic(path, hosts.render(desired, ip, marker_start, marker_end))
+    return True, added, removed
+
+
+def remove_block(path, marker_start=BLOCK_MARKER_START, marker_end=BLOCK_MARKER_END):
+    """Drop the managed section (and any stray markers). Returns True if the file changed."""
+    hosts = read_hosts(path, marker_start, marker_end)
+    if not hosts.has_section() and not hosts.stray_markers:
+        return False
+    write_atomic(path, hosts.render(None, marker_start=marker_start, marker_end=marker_end))
+    return True
@@ -0,0 +1,207 @@
+import os
+import sys
+import time
+import errno
+import socket
+import struct
+import logging
+import selectors
+
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT_HEADER = struct.Struct("iIII") # wd, mask, cookie, len
+
+# Editors and atomic replacements emit several events in a burst; collect them for this long
+SETTLE_SECONDS = 0.05
+
+
+def _load_libc():
+    import ctypes
+    import ctypes.util
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc, ctypes
+
+
+class FileWatcher:
+    """Blocks until one of a few files changes, using inotify on Linux and stat polling elsewhere.
+
+    Each file's parent directory is watched and events are filtered by name,
+    so atomic replacements (a new inode renamed over the file) are seen too.
+    wait() sleeps in select() with no CPU use between events; wake() lets a
+    signal handler interrupt it for a prompt shutdown.
+    """
+
+    def __init__(self, paths, poll_interval=15.0):
+        self.paths = [os.path.realpath(path) for path in paths]
+        self.poll_interval = poll_interval
+        self.backend = "polling"
+        self._selector = selectors.DefaultSelector()
+        # A socket pair rather than a pipe, so the wake-up channel also works with select() on Windows
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        self._fd = None
+        self._watches = {} # wd -> directory
+        self._signatures = {path: self._signature(path) for path in self.paths}
+        if sys.platform.startswith("linux"):
+            try:
+                self._start_inotify()
+            except (OSError, AttributeError) as e:
+                logging.warning(f"inotify unavailable ({e}); polling every {poll_interval}s instead.")
+                self._close_inotify()
+
+    def _start_inotify(self):
+        libc, ctypes = _load_libc()
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._fd = fd
+        for directory in sorted({os.path.dirname(path) for path in self.paths}):
+            wd = libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                raise OSError(err, f"{os.strerror(err)}: {directory}")
+            self._watches[wd] = directory
+        self._selector.register(fd, selectors.EVENT_READ)
+        self.backend = "inotify"
+
+    def _close_inotify(self):
+        if self._fd is not None:
+            try:
+                self._selector.unregister(self._fd)
+            except (KeyError, ValueError):
+                pass
+            os.close(self._fd)
+            self._fd = None
+        self._watches = {}
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            return None
+
+    def _read_events(self):
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                return changed
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b"\0")
+                offset += _EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    # Events were lost; assume everything changed
+                    changed.update(self.paths)
+                    continue
+                directory = self._watches.get(wd)
+                if directory is None:
+                    continue
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    changed.update(path for path in self.paths if os.path.dirname(path) == directory)
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if path in self.paths:
+                    changed.add(path)
+
+    def _drain_wake(self):
+        try:
+            while self._wake_r.recv(512):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def _poll_changes(self):
+        changed = set()
+        for path in self.paths:
+            signature = self._signature(path)
+            if signature != self._signatures[path]:
+                self._signatures[path] = signature
+                changed.add(path)
+        return changed
+
+    def wait(self, timeout=None):
+        """Block until a watched file changes, wake() is called or `timeout` expires.
+
+        Returns the set of changed paths (empty on timeout or wake-up).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed = set()
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if self.backend == "polling":
+                remaining = self.poll_interval if remaining is None else min(remaining, self.poll_interval)
+            woken, events = self._select(remaining)
+            changed |= events
+            if self.backend == "polling":
+                changed |= self._poll_changes()
+            if woken:
+                return changed
+            if changed:
+                # Coalesce the rest of the burst into this wake-up
+                while self.backend == "inotify" and not woken:
+                    woken, events = self._select(SETTLE_SECONDS)
+                    if not events:
+                        break
+                    changed |= events
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return changed
+
+    def _select(self, timeout):
+        woken = False
+        changed = set()
+        for key, _ in self._selector.select(timeout):
+            if key.fileobj is self._wake_r:
+                self._drain_wake()
+                woken = True
+            else:
+                changed |= self._read_events()
+        return woken, changed
+
+    def wake(self):
+        """Interrupt a blocked wait(); safe to call from a signal handler."""
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
+
+    def close(self):
+        self._close_inotify()
+        self._selector.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
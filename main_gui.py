@@ -1,10 +1,14 @@
 import sys
 import os
 import time
+import threading
 import cv2
 import numpy as np
 from face_operations import detector as face_detector
 from face_operations import training as face_trainer
+from face_operations import capture_pipeline
+from face_operations import frame_source
+from face_operations import motion_gate
 from system_actions import host_blocker as block_websites
 from system_actions import email_notifier as emailalert
 from system_actions import browser_extension as browser_ext
@@ -17,13 +21,28 @@ from PyQt6.QtWidgets import (
     QFrame, QCheckBox, QGroupBox, QListWidget, QListWidgetItem, QComboBox
 )
 from PyQt6.QtGui import QFont, QColor, QPalette, QImage, QPixmap, QAction
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QObject, QSize, QSettings
+from PyQt6.QtCore import Qt, QThread, pyqtSignal, QObject, QSize, QSettings, QTimer
 
 # Define base path relative to this script's location
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MODELS_DIR = os.path.join(BASE_DIR, 'models')
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 
+# Age inference batching: flush after this many crops or this many seconds
+AGE_BATCH_SIZE = 8
+AGE_BATCH_WINDOW_SECONDS = 0.25
+# Run full face detection every N frames and track boxes in between
+TRACKER_DETECT_INTERVAL = 10
+# Frame source: device index, video file, image folder or stream URL, plus the mode to request
+CAMERA_SOURCE = 0
+CAPTURE_WIDTH = 640
+CAPTURE_HEIGHT = 480
+CAPTURE_FPS = 30
+# Display buffers cycled between the Worker and the GUI thread (triple buffering)
+DISPLAY_BUFFER_COUNT = 3
+# Delay before background model preloading starts, leaving the first paint uncontended
+MODEL_PRELOAD_DELAY_MS = 1500
+
 # --- Stylesheets ---
 LIGHT_STYLESHEET = """
 QMainWindow, QWidget {
@@ -329,93 +348,195 @@ QMenu::separator {
 }
 """
 
+class DisplayBufferPool:
+    """Preallocated BGR buffers for handing display frames from the Worker to the GUI thread.
+
+    The pool is owned by the window, so a buffer outlives every QImage built
+    over it. The Worker acquires a free buffer, resizes the frame straight into
+    it at the label size and emits its index; the GUI wraps it as a
+    Format_BGR888 QImage, copies it into a pixmap and releases it. When every
+    buffer is still waiting for the GUI, the frame is simply not displayed.
+    """
+
+    def __init__(self, count=DISPLAY_BUFFER_COUNT):
+        self._buffers = [None] * count
+        self._busy = [False] * count
+        self._next = 0
+        self._lock = threading.Lock()
+        self.target_size = (640, 480)
+        self.dropped = 0
+
+    def set_target_size(self, width, height):
+        with self._lock:
+            self.target_size = (max(1, width), max(1, height))
+
+    def fitted_size(self, frame_w, frame_h):
+        """Largest size with the frame's aspect ratio that fits the target."""
+        target_w, target_h = self.target_size
+        scale = min(target_w / frame_w, target_h / frame_h)
+        return max(1, int(frame_w * scale)), max(1, int(frame_h * scale))
+
+    def acquire(self, width, height):
+        """Return (index, buffer) of a free buffer shaped (height, width, 3), or (None, None)."""
+        with self._lock:
+            for offset in range(len(self._buffers)):
+                index = (self._next + offset) % len(self._buffers)
+                if not self._busy[index]:
+                    break
+            else:
+                self.dropped += 1
+                return None, None
+            buffer = self._buffers[index]
+            # Only reallocate when the label size changes
+            if buffer is None or buffer.shape[:2] != (height, width):
+                buffer = np.empty((height, width, 3), dtype=np.uint8)
+                self._buffers[index] = buffer
+            self._busy[index] = True
+            self._next = (index + 1) % len(self._buffers)
+            return index, buffer
+
+    def buffer(self, index):
+        return self._buffers[index]
+
+    def release(self, index):
+        with self._lock:
+            self._busy[index] = False
+
+
 # Worker thread for running detection/actions without freezing GUI
 class Worker(QObject):
     finished = pyqtSignal()
     progress = pyqtSignal(str)
     result = pyqtSignal(bool, int, str, str)
-    frame_update = pyqtSignal(QImage) # Signal to send video frames
+    frame_update = pyqtSignal(int) # Index of the display buffer holding the new frame
+
+    def __init__(self, display_pool):
+        super().__init__()
+        self.display_pool = display_pool
+
+    def draw_display_frame(self, frame, faces, age_history):
+        """Downscale the frame into a free display buffer and draw face boxes at that scale."""
+        frame_h, frame_w = frame.shape[:2]
+        width, height = self.display_pool.fitted_size(frame_w, frame_h)
+        index, display = self.display_pool.acquire(width, height)
+        if index is None:
+            return None
+        cv2.resize(frame, (width, height), dst=display, interpolation=cv2.INTER_AREA)
+        scale = width / frame_w
+        font_scale = max(0.4, 0.7 * scale)
+        for face in faces:
+            x, y = int(face['x'] * scale), int(face['y'] * scale)
+            w, h = int(face['w'] * scale), int(face['h'] * scale)
+            name = face_detector.face_name(face['label'])
+            # Draw rectangle for every detected face
+            cv2.rectangle(display, (x, y), (x + w, y + h), (0, 255, 0), 2)
+
+            if name not in ["Error", "Unknown"]:
+                # Draw name and the latest stable age for this person
+                history = age_history.get(int(face['label']))
+                age_text = f" Age: {int(np.mean(history))}" if history else ""
+                cv2.putText(display, f"{name}{age_text}", (x, y - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, font_scale, (0, 255, 0), 2)
+            else:
+                # Still draw the label if recognition failed or face is unknown
+                cv2.putText(display, name, (x, y - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, font_scale, (0, 255, 255), 2)
+        return index
 
     def run(self):
+        run_started = time.time()
         self.progress.emit("Worker thread started. Loading models...")
-        if not face_detector.load_models(models_dir=MODELS_DIR):
+        models_ready = face_detector.load_models_async(MODELS_DIR)
+        if not models_ready.done():
+            self.progress.emit("Waiting for background model loading to finish...")
+        if not models_ready.result():
             self.progress.emit("❌ Error: Failed to load required models. Aborting.")
             self.result.emit(False, -1, "Model load failed", "Model load failed")
             self.finished.emit()
             return
         self.progress.emit("✅ Models loaded successfully.")
-
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
+        stats = face_detector.load_stats
+        self.progress.emit(f"Age backend: {stats.get('age_backend', 'unknown')}"
+                           + (f", resident memory {stats['rss_mb']:.0f} MB" if stats.get('rss_mb') else ""))
+        self.progress.emit(f"Model load {stats.get('load_seconds', 0.0):.2f}s, "
+                           f"warm-up {stats.get('warmup_seconds', 0.0):.2f}s, "
+                           f"waited {time.time() - run_started:.2f}s after start was pressed")
+        first_verdict_logged = False
+
+        source = frame_source.create_frame_source(CAMERA_SOURCE, CAPTURE_WIDTH, CAPTURE_HEIGHT, CAPTURE_FPS)
+        pipeline = capture_pipeline.CapturePipeline(
+            source=source,
+            age_batch_size=AGE_BATCH_SIZE,
+            age_batch_window=AGE_BATCH_WINDOW_SECONDS,
+            tracker=face_detector.FaceTracker(detect_interval=TRACKER_DETECT_INTERVAL),
+            motion_gate=motion_gate.MotionGate(),
+        )
+        if not pipeline.start():
             self.progress.emit("❌ Error: Cannot open webcam.")
             self.result.emit(False, -1, "Webcam error", "Webcam error")
             self.finished.emit()
             return
-        self.progress.emit("📷 Webcam opened.")
+        self.progress.emit(f"📷 Webcam opened at {source.resolution[0]}x{source.resolution[1]}"
+                           + (f", {source.fps:.0f} FPS." if source.fps else "."))
 
         start_time = time.time()
         duration_seconds = 10
-        age_predictions = []
+        age_history = {} # Rolling age window per recognised person
         content_restricted = False
         final_stable_age = -1
 
         self.progress.emit(f"🔹 Running face analysis for {duration_seconds} seconds...")
 
         while time.time() - start_time < duration_seconds:
-            ret, frame = cap.read()
-            if not ret:
-                self.progress.emit("Warning: Cannot read frame from webcam.")
-                time.sleep(0.1)
+            # Block on the pipeline output instead of sleeping; capture keeps running meanwhile
+            result = pipeline.get_result(timeout=0.2)
+            if result is None:
+                if pipeline.error:
+                    self.progress.emit(f"Warning: {pipeline.error}")
+                    break
                 continue
 
-            display_frame = frame.copy() # Draw on this copy
-            name, face_coords = face_detector.predict_face(frame)
-            stable_age = -1
-
-            if face_coords:
-                (x, y, w, h) = face_coords
-                # Draw rectangle for detected face
-                cv2.rectangle(display_frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-
-                if name not in ["No face", "Error", "Unknown"]:
-                    predicted_age = face_detector.predict_age(frame, face_coords)
-                    if predicted_age != -1:
-                        age_predictions.append(predicted_age)
-                        if len(age_predictions) > 5:
-                            age_predictions.pop(0)
-                        if age_predictions:
-                            stable_age = int(np.mean(age_predictions))
-                            final_stable_age = stable_age
-
-                        # Draw name and age on frame
-                        age_text = f" Age: {stable_age}" if stable_age != -1 else ""
-                        info_text = f"{name}{age_text}"
-                        cv2.putText(display_frame, info_text, (x, y - 10),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-
-                        # Check restriction
-                        if stable_age != -1 and stable_age < 18:
-                            content_restricted = True # Latch if child detected once
-                elif name != "No face":
-                    # Still draw name if known but age failed or unknown name
-                    cv2.putText(display_frame, name, (x, y - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+            stable_age = face_detector.record_ages(result.faces, age_history)
+            if stable_age != -1:
+                if not first_verdict_logged:
+                    first_verdict_logged = True
+                    self.progress.emit(f"⏱️ First age verdict {time.time() - run_started:.2f}s after start was pressed "
+                                       f"({time.time() - stats['requested_at']:.2f}s after model loading began)")
+                final_stable_age = stable_age
+                # Check restriction
+                if stable_age < 18:
+                    content_restricted = True # Latch if child detected once
 
             # Emit the processed frame for GUI update
             try:
-                rgb_image = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
-                h, w, ch = rgb_image.shape
-                bytes_per_line = ch * w
-                qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-                self.frame_update.emit(qt_image)
+                index = self.draw_display_frame(result.frame, result.faces, age_history)
+                if index is not None:
+                    self.frame_update.emit(index)
             except Exception as e:
-                 self.progress.emit(f"Warning: Error converting/emitting frame: {e}")
-
-            # Small delay to allow GUI updates and prevent busy-looping 100% CPU
-            time.sleep(0.01) # Approx 100 FPS theoretical max, adjust if needed
+                 self.progress.emit(f"Warning: Error drawing/emitting frame: {e}")
 
         # --- Loop Finished --- 
-        cap.release()
+        pipeline.stop()
+        pipeline_stats = pipeline.stats()
+        motion_stats = pipeline_stats.pop("motion", None)
+        if motion_stats:
+            self.progress.emit(f"Motion gate: skipped detection on {motion_stats['skipped']}/{motion_stats['frames']} "
+                               f"frames ({100.0 * motion_stats['skip_ratio']:.0f}%)")
+        for stage, stats in pipeline_stats.items():
+            self.progress.emit(f"Pipeline {stage}: {stats['frames']} frames, {stats['dropped']} dropped, "
+                               f"depth {stats['depth']}/{stats['capacity']}")
+        det_stats = face_detector.detection_stats
+        if det_stats["frame_pixels"]:
+            self.progress.emit(f"Detection: {det_stats['full_scans']} full scans, {det_stats['roi_scans']} ROI scans, "
+                               f"{100.0 * det_stats['pixels_scanned'] / det_stats['frame_pixels']:.0f}% of frame pixels scanned")
+        age_stats = face_detector.inference_stats
+        if age_stats["age_faces"]:
+            self.progress.emit(f"Age inference: {age_stats['age_faces']} faces, "
+                               f"{1000.0 * age_stats['age_seconds'] / age_stats['age_faces']:.1f} ms per face")
+        if pipeline.tracker is not None:
+            self.progress.emit(f"Tracker: {pipeline.tracker.detections_run} full detections, "
+                               f"{pipeline.tracker.frames_tracked} frames tracked, "
+                               f"{pipeline.tracker.cache.hits} cached results reused")
         self.progress.emit("✅ Analysis complete.")
 
         block_status = "No action needed."
@@ -456,9 +577,14 @@ class TrainWorker(QObject):
     def run(self):
         self.progress.emit("Starting face recognition training...")
         try:
-            # Assuming train_model prints status but doesn't return specific message
-            # We might need to modify train_model to return status later if needed
-            face_trainer.train_model()
+            # train_model prints its own status and returns whether a model was saved
+            if not face_trainer.train_model():
+                error_msg = "❌ Training failed, see the console output for details."
+                self.progress.emit(error_msg)
+                self.finished.emit(False, error_msg)
+                return
+            # Models are preloaded at startup, so swap in the new ones without a restart
+            face_detector.reload_face_model(MODELS_DIR)
             self.progress.emit("✅ Training finished successfully.")
             self.finished.emit(True, "Training completed successfully.")
         except Exception as e:
@@ -466,6 +592,43 @@ class TrainWorker(QObject):
             self.progress.emit(error_msg)
             self.finished.emit(False, error_msg)
 
+# Enrollment Worker: adds newly captured members to the existing face index
+class EnrollWorker(QObject):
+    finished = pyqtSignal(bool, str) # bool success, str message
+    progress = pyqtSignal(str)
+
+    def __init__(self, captured_images):
+        super().__init__()
+        self.captured_images = captured_images
+
+    def run(self):
+        try:
+            enrolled = []
+            if not face_trainer.has_index():
+                # No index to append to yet: one full train covers every member saved this
+                # session, so appending them afterwards would index their faces twice
+                self.progress.emit("No face index found, training on the full dataset...")
+                if face_trainer.train_model():
+                    enrolled = list(self.captured_images)
+            else:
+                for name, images in self.captured_images.items():
+                    self.progress.emit(f"Enrolling {name} ({len(images)} images)...")
+                    if face_trainer.add_member(name, images):
+                        enrolled.append(name)
+                    else:
+                        self.progress.emit(f"⚠️ Could not enroll {name}.")
+            if not enrolled:
+                self.finished.emit(False, "No members were enrolled.")
+                return
+            # Monitoring picks up the new index without a restart
+            face_detector.reload_face_model(MODELS_DIR)
+            self.progress.emit("✅ Face index updated.")
+            self.finished.emit(True, f"Enrolled: {', '.join(enrolled)}")
+        except Exception as e:
+            error_msg = f"❌ Error during enrollment: {e}"
+            self.progress.emit(error_msg)
+            self.finished.emit(False, error_msg)
+
 # Main Application Window
 class MainAppGUI(QMainWindow):
     def __init__(self):
@@ -476,6 +639,7 @@ class MainAppGUI(QMainWindow):
         self.monitor_worker = None
         self.train_thread = None
         self.train_worker = None
+        self.display_pool = DisplayBufferPool()
         
         # Load settings
         self.settings = QSettings("AI-Child-Protection", "MainApp")
@@ -483,7 +647,10 @@ class MainAppGUI(QMainWindow):
         
         self.init_ui()
         self.apply_theme()
-        self.check_initial_files() # Check files on startup
+        if self.check_initial_files(): # Check files on startup
+            # Load and warm up models in the background once the window has painted,
+            # so the first scan starts immediately without delaying startup
+            QTimer.singleShot(MODEL_PRELOAD_DELAY_MS, lambda: face_detector.load_models_async(MODELS_DIR))
 
     def init_ui(self):
         self.setWindowTitle("AI Child Protection")
@@ -845,13 +1012,19 @@ class MainAppGUI(QMainWindow):
         timestamp = time.strftime("%H:%M:%S")
         self.train_log.append(f"[{timestamp}] {message}")
 
-    def update_monitor_image(self, qt_image):
+    def update_monitor_image(self, index):
         try:
-            pixmap = QPixmap.fromImage(qt_image)
-            scaled_pixmap = pixmap.scaled(self.monitor_webcam_label.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-            self.monitor_webcam_label.setPixmap(scaled_pixmap)
+            # The Worker already downscaled to the label size; fromImage copies, so the buffer can be reused
+            buffer = self.display_pool.buffer(index)
+            h, w = buffer.shape[:2]
+            qt_image = QImage(buffer.data, w, h, buffer.strides[0], QImage.Format.Format_BGR888)
+            self.monitor_webcam_label.setPixmap(QPixmap.fromImage(qt_image))
         except Exception as e:
              print(f"Error updating GUI image: {e}")
+        finally:
+            self.display_pool.release(index)
+            size = self.monitor_webcam_label.contentsRect().size()
+            self.display_pool.set_target_size(size.width(), size.height())
 
     def check_initial_files(self):
         # Check for models required for monitoring
@@ -860,6 +1033,11 @@ class MainAppGUI(QMainWindow):
             os.path.join(MODELS_DIR, 'label_map.pkl'),
             os.path.join(MODELS_DIR, 'age_model.h5')
         ]
+        # A converted TFLite/ONNX age model can stand in for the Keras .h5
+        age_model_files = [os.path.join(MODELS_DIR, name) for name in
+                           ('age_model.h5', 'age_model.tflite', 'age_model.onnx')]
+        if any(os.path.exists(f) for f in age_model_files):
+            required_model_files = required_model_files[:2]
         missing_files = [f for f in required_model_files if not os.path.exists(f)]
         if missing_files:
             self.log_monitor("ERROR: Cannot start monitoring. Missing required model files:")
@@ -894,7 +1072,9 @@ class MainAppGUI(QMainWindow):
         self.log_monitor("Starting monitoring thread...")
 
         self.monitor_thread = QThread()
-        self.monitor_worker = Worker() # Use renamed worker
+        size = self.monitor_webcam_label.contentsRect().size()
+        self.display_pool.set_target_size(size.width(), size.height())
+        self.monitor_worker = Worker(self.display_pool) # Use renamed worker
         self.monitor_worker.moveToThread(self.monitor_thread)
 
         self.monitor_worker.progress.connect(self.log_monitor)
@@ -949,8 +1129,8 @@ class MainAppGUI(QMainWindow):
             dialog.deleteLater()
             return
 
-        # Connect the signal before executing
-        dialog.session_complete.connect(self.run_training)
+        # Connect the signal before executing; only the new captures are enrolled
+        dialog.session_complete.connect(lambda: self.run_enrollment(dialog.captured_images))
 
         # Execute the dialog - this blocks until the dialog is closed
         # No need to check result code, signal handles success
@@ -980,6 +1160,32 @@ class MainAppGUI(QMainWindow):
 
         self.train_thread.start()
 
+    def run_enrollment(self, captured_images):
+        if self.is_training:
+            self.log_training("Training already in progress.")
+            return
+        # Monitoring stays available: enrollment only appends to the face index
+        self.is_training = True
+        self.log_training("Starting enrollment thread...")
+
+        self.train_thread = QThread()
+        self.train_worker = EnrollWorker(dict(captured_images))
+        self.train_worker.moveToThread(self.train_thread)
+
+        self.train_worker.progress.connect(self.log_training)
+        self.train_worker.finished.connect(self.handle_training_result)
+        self.train_thread.started.connect(self.train_worker.run)
+        self.train_worker.finished.connect(self.train_thread.quit)
+        self.train_worker.finished.connect(self.train_worker.deleteLater)
+        self.train_thread.finished.connect(self.train_thread.deleteLater)
+        self.train_thread.finished.connect(self.on_enrollment_finished)
+
+        self.train_thread.start()
+
+    def on_enrollment_finished(self):
+        self.log_training("Enrollment thread finished.")
+        self.is_training = False
+
     def handle_training_result(self, success, message):
         self.log_training(f"=> RESULT: {message}")
         if success:
@@ -0,0 +1,269 @@
+import os
+import time
+import signal
+import logging
+import argparse
+import tempfile
+from collections import deque
+
+# Headless, long-running alternative to the GUI's 10-second scan. Samples the
+# camera slowly while nobody new is in view, speeds up when a new face appears,
+# and applies or lifts website blocking from a rolling verdict with hysteresis.
+
+from face_operations import detector as face_detector
+from face_operations import frame_source
+from face_operations import motion_gate
+from system_actions import host_blocker as block_websites
+from system_actions import email_notifier as emailalert
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(BASE_DIR, 'models')
+
+log_dir = os.path.join(tempfile.gettempdir(), "ai_child_protection_logs")
+os.makedirs(log_dir, exist_ok=True)
+log_file = os.path.join(log_dir, "monitor_daemon.log")
+
+# Sampling rates: idle when nobody new is in view, active for a while after a new face appears
+IDLE_FPS = 1.0
+ACTIVE_FPS = 8.0
+ACTIVE_HOLD_SECONDS = 10.0
+# Full detection every N samples; flow tracking covers the frames in between
+TRACKER_DETECT_INTERVAL = 3
+# Fraction of one CPU core the daemon may use on average (all threads included)
+CPU_BUDGET = 0.25
+# Rolling verdict: block once enough recent observations are of a child,
+# lift the block only after no child has been seen for UNBLOCK_AFTER_SECONDS
+AGE_LIMIT = 18
+VERDICT_WINDOW_SECONDS = 30.0
+BLOCK_RATIO = 0.6
+MIN_OBSERVATIONS = 5
+UNBLOCK_AFTER_SECONDS = 600.0
+STATUS_LOG_INTERVAL = 300.0
+
+running = True
+
+
+def signal_handler(sig, frame):
+    """Handle termination signals"""
+    global running
+    logging.info(f"Received signal {sig}, shutting down...")
+    running = False
+
+
+class RollingVerdict:
+    """Time-windowed child/adult verdict with separate block and unblock conditions.
+
+    Each observation is the youngest stable age among recognised faces in one
+    sampled frame. Blocking needs `block_ratio` of the observations in the last
+    `window_seconds` to be under `age_limit`; unblocking needs no child
+    observation for `unblock_after_seconds`, so a child briefly leaving the
+    frame (or one misjudged frame) does not flap the hosts file.
+    """
+
+    def __init__(self, age_limit=AGE_LIMIT, window_seconds=VERDICT_WINDOW_SECONDS, block_ratio=BLOCK_RATIO,
+                 min_observations=MIN_OBSERVATIONS, unblock_after_seconds=UNBLOCK_AFTER_SECONDS):
+        self.age_limit = age_limit
+        self.window_seconds = window_seconds
+        self.block_ratio = block_ratio
+        self.min_observations = min_observations
+        self.unblock_after_seconds = unblock_after_seconds
+        self.blocked = False
+        self.last_child_seen = None
+        self._observations = deque() # (timestamp, is_child)
+
+    def observe(self, youngest_age, now=None):
+        now = time.monotonic() if now is None else now
+        if youngest_age != -1:
+            is_child = youngest_age < self.age_limit
+            self._observations.append((now, is_child))
+            if is_child:
+                self.last_child_seen = now
+        while self._observations and now - self._observations[0][0] > self.window_seconds:
+            self._observations.popleft()
+
+    def child_ratio(self):
+        if not self._observations:
+            return 0.0
+        return sum(1 for _, is_child in self._observations if is_child) / len(self._observations)
+
+    def decide(self, now=None):
+        """Return "block", "unblock" or None when the state should not change."""
+        now = time.monotonic() if now is None else now
+        if not self.blocked:
+            if len(self._observations) >= self.min_observations and self.child_ratio() >= self.block_ratio:
+                self.blocked = True
+                return "block"
+        elif self.last_child_seen is None or now - self.last_child_seen >= self.unblock_after_seconds:
+            self.blocked = False
+            return "unblock"
+        return None
+
+
+class AdaptiveRate:
+    """Chooses the delay until the next sample from activity and the CPU budget.
+
+    Runs at `active_fps` for `hold_seconds` after a new face (track) appears or
+    while a recognised face has no age yet, otherwise at `idle_fps`. The delay is
+    stretched so that average CPU time per wall-clock second stays under
+    `cpu_budget` cores.
+    """
+
+    def __init__(self, idle_fps=IDLE_FPS, active_fps=ACTIVE_FPS, hold_seconds=ACTIVE_HOLD_SECONDS,
+                 cpu_budget=CPU_BUDGET):
+        self.idle_fps = idle_fps
+        self.active_fps = active_fps
+        self.hold_seconds = hold_seconds
+        self.cpu_budget = cpu_budget
+        self.active_until = 0.0
+        self.cpu_per_frame = 0.0
+        self._seen_tracks = set()
+
+    def note_faces(self, faces, now=None):
+        now = time.monotonic() if now is None else now
+        track_ids = {int(track_id) for track_id in faces['track_id']}
+        new_tracks = track_ids - self._seen_tracks
+        self._seen_tracks = track_ids
+        # Unrecognised faces are never aged, so only recognised ones can be waiting for an age
+        pending_age = any(face['age'] == -1 and face_detector.face_name(face['label']) not in ("Error", "Unknown")
+                          for face in faces)
+        if new_tracks or pending_age:
+            self.active_until = now + self.hold_seconds
+
+    def note_cpu(self, cpu_seconds):
+        # Exponential moving average keeps one slow frame (e.g. a full detection) from stalling sampling
+        self.cpu_per_frame = cpu_seconds if not self.cpu_per_frame else 0.8 * self.cpu_per_frame + 0.2 * cpu_seconds
+
+    def is_active(self, now=None):
+        now = time.monotonic() if now is None else now
+        return now < self.active_until
+
+    def interval(self, now=None):
+        fps = self.active_fps if self.is_active(now) else self.idle_fps
+        budget_interval = self.cpu_per_frame / self.cpu_budget if self.cpu_budget > 0 else 0.0
+        return max(1.0 / fps, budget_interval)
+
+
+def apply_decision(decision, verdict, send_email=True):
+    if decision == "block":
+        logging.warning(f"Child detected in {100.0 * verdict.child_ratio():.0f}% of recent samples, blocking websites")
+        logging.info(f"Block result: {block_websites.block_sites()}")
+        if send_email:
+            try:
+                logging.info(f"Email result: {emailalert.send_email_alert()}")
+            except Exception as e:
+                logging.warning(f"Error sending email alert: {e}")
+    elif decision == "unblock":
+        logging.info(f"No child seen for {verdict.unblock_after_seconds:.0f}s, lifting website block")
+        logging.info(f"Unblock result: {block_websites.unblock_sites()}")
+
+
+def run_monitor(source_spec=0, width=640, height=480, rate=None, verdict=None, send_email=True):
+    """Sample the camera until a termination signal arrives, enforcing blocking from the rolling verdict."""
+    global running
+    rate = rate or AdaptiveRate()
+    verdict = verdict or RollingVerdict()
+
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    logging.info("Starting AI Child Protection monitor daemon")
+    if not block_websites.is_admin():
+        logging.warning("Not running with admin/root privileges; blocking will fail")
+    if not face_detector.load_models(MODELS_DIR):
+        logging.error("Failed to load required models")
+        return "❌ Failed to load required models"
+    face_detector.warm_up_models()
+
+    source = frame_source.open_frame_source(source_spec, width, height)
+    if not source.isOpened():
+        logging.error(f"Cannot open frame source {source_spec}")
+        return "❌ Cannot open frame source"
+    logging.info(f"Frame source {source_spec} opened at {source.resolution}")
+
+    tracker = face_detector.FaceTracker(detect_interval=TRACKER_DETECT_INTERVAL)
+    gate = motion_gate.MotionGate()
+    age_history = {}
+    youngest_age = -1
+    frames = 0
+    active_frames = 0
+    last_status = time.monotonic()
+    try:
+        while running:
+            cycle_started = time.monotonic()
+            cpu_started = time.process_time()
+            if not rate.is_active(cycle_started):
+                # After an idle sleep the driver's buffered frame is stale; drop it
+                source.grab()
+            ret, frame = source.read()
+            if not ret:
+                logging.warning("Frame read failed, retrying")
+                time.sleep(1.0)
+                continue
+
+            if gate.check(frame, cycle_started):
+                faces = tracker.update(frame, with_age=True)
+                rate.note_faces(faces, cycle_started)
+                # Only people in view count: drop the age windows of anyone who has left,
+                # so a child walking away stops refreshing the verdict while a parent stays
+                present = {int(label) for label in faces['label']}
+                for label in [label for label in age_history if label not in present]:
+                    del age_history[label]
+                youngest_age = face_detector.record_ages(faces, age_history)
+            else:
+                tracker.skip_frame()
+            # A static scene repeats the last observation, so a child sitting still keeps the block
+            verdict.observe(youngest_age, cycle_started)
+            decision = verdict.decide(cycle_started)
+            if decision:
+                apply_decision(decision, verdict, send_email)
+
+            rate.note_cpu(time.process_time() - cpu_started)
+            frames += 1
+            active_frames += rate.is_active()
+            if cycle_started - last_status >= STATUS_LOG_INTERVAL:
+                logging.info(f"{frames} frames sampled ({active_frames} active), "
+                             f"{1000.0 * rate.cpu_per_frame:.0f} ms CPU per frame, "
+                             f"{100.0 * gate.skip_ratio:.0f}% skipped by the motion gate, "
+                             f"child ratio {verdict.child_ratio():.2f}, blocked={verdict.blocked}")
+                last_status = cycle_started
+
+            delay = rate.interval() - (time.monotonic() - cycle_started)
+            if delay > 0:
+                time.sleep(delay)
+    except Exception as e:
+        logging.exception(f"Error in monitor loop: {e}")
+    finally:
+        source.release()
+
+    logging.info("Monitor daemon shutting down")
+    return "✅ Monitor stopped"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AI Child Protection headless monitoring daemon")
+    parser.add_argument("--source", default="0", help="Device index, video file, image folder or stream URL")
+    parser.add_argument("--resolution", default="640x480", help="Capture resolution WIDTHxHEIGHT")
+    parser.add_argument("--idle-fps", type=float, default=IDLE_FPS, help="Sampling rate with no new faces")
+    parser.add_argument("--active-fps", type=float, default=ACTIVE_FPS, help="Sampling rate after a new face appears")
+    parser.add_argument("--cpu-budget", type=float, default=CPU_BUDGET,
+                        help="Average CPU cores the daemon may use, e.g. 0.25")
+    parser.add_argument("--unblock-after", type=float, default=UNBLOCK_AFTER_SECONDS,
+                        help="Seconds without a child in view before the block is lifted")
+    parser.add_argument("--no-email", action="store_true", help="Do not send an email alert when blocking")
+    parser.add_argument("--foreground", action="store_true", help="Log to the console instead of the log file")
+    args = parser.parse_args()
+
+    if args.foreground:
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+    else:
+        logging.basicConfig(filename=log_file, level=logging.INFO,
+                            format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    print(run_monitor(
+        args.source, width, height,
+        rate=AdaptiveRate(args.idle_fps, args.active_fps, cpu_budget=args.cpu_budget),
+        verdict=RollingVerdict(unblock_after_seconds=args.unblock_after),
+        send_email=not args.no_email,
+    ))
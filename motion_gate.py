@@ -0,0 +1,68 @@
+import cv2
+import time
+import numpy as np
+
+
+class MotionGate:
+    """Cheap scene-change test run before the face detection stack.
+
+    Each frame is shrunk to a thumbnail, blurred and compared with a running
+    average background (cv2.accumulateWeighted). The frame passes the gate
+    when more than `min_changed_fraction` of thumbnail pixels differ from the
+    background by over `pixel_threshold`; otherwise detection, recognition and
+    age inference can be skipped and the previous result reused. A frame is
+    let through at least every `refresh_seconds` so a perfectly still person
+    is still re-checked now and then.
+    """
+
+    def __init__(self, width=160, pixel_threshold=25, min_changed_fraction=0.01,
+                 learning_rate=0.05, refresh_seconds=30.0):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.learning_rate = learning_rate
+        self.refresh_seconds = refresh_seconds
+        self._background = None
+        self._last_pass = None
+        self.frames = 0
+        self.skipped = 0
+        self.last_changed_fraction = 0.0
+
+    def _thumbnail(self, frame):
+        h, w = frame.shape[:2]
+        size = (self.width, max(1, int(round(h * self.width / w))))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def check(self, frame, now=None):
+        """Return True if the frame should go through detection, False if the scene is unchanged."""
+        now = time.monotonic() if now is None else now
+        self.frames += 1
+        thumb = self._thumbnail(frame)
+        if self._background is None or self._background.shape != thumb.shape:
+            self._background = thumb.astype(np.float32)
+            self._last_pass = now
+            return True
+
+        diff = cv2.absdiff(thumb, cv2.convertScaleAbs(self._background))
+        self.last_changed_fraction = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+        cv2.accumulateWeighted(thumb, self._background, self.learning_rate)
+
+        if self.last_changed_fraction > self.min_changed_fraction or now - self._last_pass >= self.refresh_seconds:
+            self._last_pass = now
+            return True
+        self.skipped += 1
+        return False
+
+    def reset(self):
+        self._background = None
+        self._last_pass = None
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def stats(self):
+        return {"frames": self.frames, "skipped": self.skipped, "skip_ratio": self.skip_ratio}
@@ -0,0 +1,167 @@
+import sys
+import os
+import json
+import time
+import argparse
+import platform
+import subprocess
+
+# Replays recorded video or a folder of images through the face pipeline and
+# reports per-stage latency percentiles, FPS, peak RSS and face-count scaling.
+# Runs headless, so results can be compared between commits on a CI box.
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
+
+import cv2
+import numpy as np
+from face_operations import detector as face_detector
+from face_operations import frame_source
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(BASE_DIR, 'models')
+STAGES = ("read", "detect", "recognize", "age", "total")
+
+
+def iter_frames(path, max_frames=None, width=None, height=None):
+    """Yield BGR frames from any frame source (video file, image directory, stream URL), unpaced."""
+    count = 0
+    cap = frame_source.open_frame_source(path, width, height)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open frame source {path}")
+    try:
+        while max_frames is None or count < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                return
+            count += 1
+            yield frame
+    finally:
+        cap.release()
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+
+def percentiles(samples):
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    values = np.array(samples) * 1000.0
+    return {"p50": float(np.percentile(values, 50)), "p95": float(np.percentile(values, 95)),
+            "p99": float(np.percentile(values, 99)), "mean": float(values.mean())}
+
+
+def run_benchmark(source, max_frames=None, with_age=True, width=None, height=None):
+    """Run every frame of `source` through detection, recognition and age inference, timing each stage."""
+    timings = {stage: [] for stage in STAGES}
+    by_face_count = {}
+    frames = 0
+    started = time.perf_counter()
+    frame_iter = iter_frames(source, max_frames, width, height)
+    while True:
+        t0 = time.perf_counter()
+        frame = next(frame_iter, None)
+        if frame is None:
+            break
+        t1 = time.perf_counter()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        boxes = face_detector._detect_faces(gray, frame)
+        t2 = time.perf_counter()
+        labels = face_detector._recognize_faces(gray, boxes) if len(boxes) else []
+        t3 = time.perf_counter()
+        if with_age and len(boxes):
+            face_detector.predict_age_batch([frame], [boxes])
+        t4 = time.perf_counter()
+
+        frames += 1
+        timings["read"].append(t1 - t0)
+        timings["detect"].append(t2 - t1)
+        if len(boxes):
+            timings["recognize"].append(t3 - t2)
+            if with_age:
+                timings["age"].append(t4 - t3)
+        processing = t4 - t1
+        timings["total"].append(processing)
+        by_face_count.setdefault(len(labels), []).append(processing)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "frames": frames,
+        "elapsed_seconds": elapsed,
+        "fps": frames / elapsed if elapsed > 0 else 0.0,
+        "stages_ms": {stage: percentiles(samples) for stage, samples in timings.items()},
+        "face_count_scaling_ms": {str(count): dict(percentiles(samples), frames=len(samples))
+                                  for count, samples in sorted(by_face_count.items())},
+        "detection": dict(face_detector.detection_stats),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=BASE_DIR).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(current, baseline):
+    lines = [f"Compared with {baseline.get('revision') or 'baseline'}:"]
+    for stage in STAGES:
+        now = current["stages_ms"][stage]["p95"]
+        before = baseline.get("stages_ms", {}).get(stage, {}).get("p95")
+        if now is not None and before:
+            lines.append(f"  {stage:<10} p95 {before:8.2f} -> {now:8.2f} ms ({100.0 * (now - before) / before:+.1f}%)")
+    if baseline.get("fps"):
+        lines.append(f"  fps        {baseline['fps']:8.2f} -> {current['fps']:8.2f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the face pipeline on recorded video or images.")
+    parser.add_argument("source", help="Video file, directory of images or stream URL")
+    parser.add_argument("--resolution", help="Resize frames to WIDTHxHEIGHT before processing, e.g. 640x480")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--max-frames", type=int, help="Stop after this many frames")
+    parser.add_argument("--no-age", action="store_true", help="Skip age inference")
+    parser.add_argument("--output", default="bench_output.json", help="JSON results path")
+    parser.add_argument("--compare", help="Previous JSON results to compare p95 latencies against")
+    args = parser.parse_args()
+
+    if not face_detector.load_models(args.models_dir):
+        print("❌ Error: Failed to load required models.")
+        sys.exit(1)
+    face_detector.warm_up_models()
+
+    width, height = (int(v) for v in args.resolution.lower().split("x")) if args.resolution else (None, None)
+    results = run_benchmark(args.source, args.max_frames, with_age=not args.no_age, width=width, height=height)
+    results.update({
+        "source": args.source,
+        "resolution": args.resolution,
+        "revision": git_revision(),
+        "age_backend": face_detector.load_stats.get("age_backend"),
+        "face_detector": face_detector.load_stats.get("face_detector"),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+    })
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{results['frames']} frames in {results['elapsed_seconds']:.2f}s ({results['fps']:.1f} FPS), "
+          f"peak RSS {results['peak_rss_mb']:.0f} MB")
+    for stage, stats in results["stages_ms"].items():
+        if stats["p50"] is not None:
+            print(f"  {stage:<10} p50 {stats['p50']:8.2f}  p95 {stats['p95']:8.2f}  p99 {stats['p99']:8.2f} ms")
+    for count, stats in results["face_count_scaling_ms"].items():
+        print(f"  {count} face(s): {stats['frames']} frames, mean {stats['mean']:.2f} ms")
+    if args.compare:
+        with open(args.compare, "r") as f:
+            print(compare(results, json.load(f)))
+    print(f"✅ Results written to {args.output}")
@@ -0,0 +1,106 @@
+import sys
+import os
+import json
+import argparse
+import subprocess
+
+# Measures GUI startup cost: a `python -X importtime` profile of main_gui and,
+# optionally, the wall time from interpreter start to the first painted window.
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'src'))
+HEAVY_MODULES = ("tensorflow", "sklearn", "keras")
+
+FIRST_PAINT_SNIPPET = """
+import time
+started = time.perf_counter()
+from main_gui import MainAppGUI, QApplication
+imported = time.perf_counter()
+app = QApplication([])
+gui = MainAppGUI()
+gui.show()
+app.processEvents()
+painted = time.perf_counter()
+print(f"{imported - started:.6f} {painted - started:.6f}")
+"""
+
+
+def _child_env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = SRC_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+
+def profile_imports(module="main_gui"):
+    """Run `python -X importtime -c 'import <module>'` and parse the per-module timings."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=_child_env()
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        name = fields[2].rstrip()
+        entries.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_us": int(fields[0]),
+            "cumulative_us": int(fields[1]),
+        })
+    top_level = [entry for entry in entries if entry["depth"] == 0]
+    return {
+        "module": module,
+        "returncode": proc.returncode,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode != 0 and proc.stderr.strip() else None,
+        "total_ms": sum(entry["cumulative_us"] for entry in top_level) / 1000.0,
+        "modules_imported": len(entries),
+        "heavy_modules_imported": sorted({entry["module"].split(".")[0] for entry in entries
+                                          if entry["module"].split(".")[0] in HEAVY_MODULES}),
+        "slowest": sorted(top_level, key=lambda entry: entry["cumulative_us"], reverse=True),
+    }
+
+
+def measure_first_paint():
+    """Time interpreter start -> main_gui imported -> first window painted, in a fresh process."""
+    proc = subprocess.run([sys.executable, "-c", FIRST_PAINT_SNIPPET],
+                          capture_output=True, text=True, env=_child_env())
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+    import_s, paint_s = (float(value) for value in proc.stdout.split()[-2:])
+    return {"import_ms": import_s * 1000.0, "first_paint_ms": paint_s * 1000.0}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile AI Child Protection GUI startup time.")
+    parser.add_argument("--module", default="main_gui", help="Module to import-profile (default: main_gui)")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to show")
+    parser.add_argument("--first-paint", action="store_true", help="Also time the first painted window")
+    parser.add_argument("--json", help="Write the full report to this JSON file")
+    args = parser.parse_args()
+
+    report = {"imports": profile_imports(args.module)}
+    if args.first_paint:
+        report["first_paint"] = measure_first_paint()
+
+    imports = report["imports"]
+    if imports["error"]:
+        print(f"Import failed: {imports['error']}")
+    print(f"Import of {imports['module']}: {imports['total_ms']:.1f} ms across {imports['modules_imported']} modules")
+    print(f"Heavy modules imported at startup: {', '.join(imports['heavy_modules_imported']) or 'none'}")
+    for entry in imports["slowest"][:args.top]:
+        print(f"  {entry['cumulative_us'] / 1000.0:9.1f} ms  {entry['module']}")
+    if "first_paint" in report:
+        paint = report["first_paint"]
+        if "error" in paint:
+            print(f"First paint measurement failed: {paint['error']}")
+        else:
+            print(f"main_gui imported after {paint['import_ms']:.1f} ms, first paint after {paint['first_paint_ms']:.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json}")
@@ -1,9 +1,8 @@
 import cv2
 import os
 import numpy as np
-import pickle
-from sklearn.model_selection import train_test_split
-from sklearn.neighbors import KNeighborsClassifier
+from . import face_embedding
+from . import feature_cache
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -11,12 +10,12 @@ MODELS_DIR = os.path.join(BASE_DIR, 'models')
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 
 def train_model():
-    
+    """Train the eigenface projection and face index from the whole dataset; returns True on success."""
     dataset_path = os.path.join(DATA_DIR, "family_dataset")
     if not os.path.exists(dataset_path) or not os.listdir(dataset_path):
         print(f"Error: Dataset folder '{dataset_path}' is missing or empty.")
         print("Please run the dataset creation script first.")
-        return
+        return False
 
     
     if not os.path.exists(MODELS_DIR):
@@ -24,66 +23,183 @@ def train_model():
         print(f"Created models directory: {MODELS_DIR}")
 
     print(f"🔹 Loading images from '{dataset_path}'...")
-    X = []  
-    y = []  
-    label_map = {}  
-    current_label = 0
+    cache_dir = os.path.join(MODELS_DIR, feature_cache.CACHE_DIRNAME)
+    X, image_paths = feature_cache.load_features(dataset_path, cache_dir)
 
     
-    for person in os.listdir(dataset_path):
-        person_path = os.path.join(dataset_path, person)
-
-        if os.path.isdir(person_path):
-            print(f"   Processing images for {person}...")
-            image_count = 0
-            label_map[current_label] = person  
-
-            for img_name in os.listdir(person_path):
-                img_path = os.path.join(person_path, img_name)
-                try:
-                    img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
-                    if img is None:
-                        print(f"Warning: Could not read image {img_name} in {person_path}. Skipping.")
-                        continue
-                    img = cv2.resize(img, (100, 100))  
-                    X.append(img.flatten())  
-                    y.append(current_label)
-                    image_count += 1
-                except Exception as e:
-                    print(f"Warning: Error processing image {img_name} in {person_path}: {e}. Skipping.")
-
-            if image_count == 0:
-                print(f"Warning: No valid images found for {person}. Removing from training.")
-                del label_map[current_label] 
-                
-            else:
-                 current_label += 1 
-
-    if not X or not y:
+    persons = [entry for entry in sorted(os.listdir(dataset_path))
+               if os.path.isdir(os.path.join(dataset_path, entry))]
+    person_of_image = np.array([path.split(os.sep, 1)[0] for path in image_paths])
+    y = np.empty(len(image_paths), dtype=np.int32)
+    label_map = {}
+    current_label = 0
+    for person in persons:
+        mask = person_of_image == person
+        image_count = int(mask.sum())
+        if image_count == 0:
+            print(f"Warning: No valid images found for {person}. Removing from training.")
+            continue
+        print(f"   {person}: {image_count} images")
+        label_map[current_label] = person
+        y[mask] = current_label
+        current_label += 1
+
+    if len(image_paths) == 0:
         print("Error: No valid training data found after processing dataset folder.")
-        return
+        return False
 
-    print("🔹 Training KNN model...")
-    X = np.array(X)
-    y = np.array(y)
+    print("🔹 Fitting eigenface projection...")
+    projection = face_embedding.fit_projection(X)
+    embeddings = face_embedding.embed(projection, X)
+    print(f"   Projected {X.shape[1]} pixels to {embeddings.shape[1]} dimensions.")
 
-    
-    
-    knn = KNeighborsClassifier(n_neighbors=min(3, len(np.unique(y)))) 
-    knn.fit(X, y)
+    print("🔹 Building face index...")
+    index = face_embedding.build_index(embeddings, y, n_neighbors=min(3, len(np.unique(y))))
 
-    
-    model_filename = os.path.join(MODELS_DIR, "face_recognition_model.pkl")
-    label_map_filename = os.path.join(MODELS_DIR, "label_map.pkl")
     try:
-        with open(model_filename, "wb") as f:
-            pickle.dump(knn, f)
-        with open(label_map_filename, "wb") as f:
-            pickle.dump(label_map, f)
-        print(f"✅ Training complete! Model saved as {model_filename}")
-        print(f"✅ Label map saved as {label_map_filename}")
+        face_embedding.save_model(MODELS_DIR, projection, index, label_map)
+        print(f"✅ Training complete! Model saved in {MODELS_DIR}")
+        print(f"✅ Files: {face_embedding.PROJECTION_FILENAME}, {face_embedding.INDEX_FILENAME}, "
+              f"{face_embedding.LABEL_MAP_FILENAME}")
+    except Exception as e:
+        print(f"Error saving model files: {e}")
+        return False
+    return True
+
+def _load_member_images(images):
+    paths = [image for image in images if isinstance(image, str)]
+    samples, ok = feature_cache.decode_images(paths)
+    for path, readable in zip(paths, ok):
+        if not readable:
+            print(f"Warning: Could not read image {path}. Skipping.")
+    samples = [samples[ok]]
+    for img in images:
+        if isinstance(img, str):
+            continue
+        if img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        samples.append(cv2.resize(img, feature_cache.FACE_SIZE).reshape(1, -1))
+    return np.vstack(samples).astype(np.uint8, copy=False)
+
+def _load_existing_model():
+    try:
+        projection, index, label_map = face_embedding.load_model(MODELS_DIR)
+    except FileNotFoundError:
+        return None
+    if index is None:
+        return None
+    return projection, index, label_map
+
+def has_index():
+    """True when an embedding index exists that add_member can append to."""
+    return _load_existing_model() is not None
+
+def _save_with_index(projection, embeddings, labels, label_map):
+    n_neighbors = min(3, len(np.unique(labels)))
+    index = face_embedding.build_index(embeddings, labels, n_neighbors=max(1, n_neighbors))
+    face_embedding.save_model(MODELS_DIR, projection, index, label_map)
+
+def _refit_with_member(label_map, label, samples):
+    """Refit the projection on every enrolled member's cached features plus `samples` for `label`.
+
+    Returns (projection, embeddings, labels), or None when an enrolled member has
+    no images left in the dataset to refit from.
+    """
+    dataset_path = os.path.join(DATA_DIR, "family_dataset")
+    if not os.path.isdir(dataset_path):
+        return None
+    cache_dir = os.path.join(MODELS_DIR, feature_cache.CACHE_DIRNAME)
+    X, image_paths = feature_cache.load_features(dataset_path, cache_dir)
+    person_of_image = np.array([path.split(os.sep, 1)[0] for path in image_paths])
+    rows = []
+    row_labels = []
+    for member_label, person in label_map.items():
+        if member_label == label:
+            continue # The member being enrolled comes from `samples`
+        member_rows = np.flatnonzero(person_of_image == person)
+        if len(member_rows) == 0:
+            return None
+        rows.append(member_rows)
+        row_labels.append(np.full(len(member_rows), member_label, dtype=np.int32))
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.intp)
+    X = np.vstack([np.asarray(X[rows]), samples])
+    labels = np.concatenate(row_labels + [np.full(len(samples), label, dtype=np.int32)])
+    projection = face_embedding.fit_projection(X)
+    return projection, face_embedding.embed(projection, X), labels
+
+def add_member(name, images):
+    """Enroll images for one person without retraining from scratch.
+
+    `images` are file paths or grayscale/BGR arrays. The new embeddings are
+    appended to the existing index using the current eigenface projection, so
+    the cost depends only on the number of new images. Falls back to a full
+    train_model() when no embedding index exists yet. While the projection is
+    below EMBEDDING_DIM components (fitted on too few faces to span later
+    members), it is refitted from the feature cache instead of appended to.
+    """
+    existing = _load_existing_model()
+    if existing is None:
+        print("🔹 No embedding index found, running full training instead.")
+        return train_model()
+    projection, index, label_map = existing
+
+    samples = _load_member_images(images)
+    if len(samples) == 0:
+        print(f"Error: No valid images provided for {name}.")
+        return False
+
+    label = next((key for key, value in label_map.items() if value == name), None)
+    if label is None:
+        label = max(label_map, default=-1) + 1
+        label_map[label] = name
+
+    print(f"🔹 Enrolling {len(samples)} images for {name}...")
+    refit = None
+    if projection.n_components_ < face_embedding.EMBEDDING_DIM:
+        # A basis fitted on the first few people only spans their variation; refit it
+        # from the cached features (no image decodes) until it reaches full size
+        refit = _refit_with_member(label_map, label, samples)
+        if refit is None:
+            print("Warning: Some enrolled members have no dataset images; appending to the existing projection.")
+    if refit is not None:
+        projection, embeddings, labels = refit
+        print(f"   Refitted eigenface projection with {projection.n_components_} dimensions.")
+    else:
+        embeddings = np.vstack([face_embedding.index_embeddings(index), face_embedding.embed(projection, samples)])
+        labels = np.concatenate([index["labels"], np.full(len(samples), label, dtype=np.int32)])
+    try:
+        _save_with_index(projection, embeddings, labels, label_map)
+    except Exception as e:
+        print(f"Error saving model files: {e}")
+        return False
+    print(f"✅ {name} enrolled ({len(labels)} faces indexed).")
+    return True
+
+def remove_member(name):
+    """Remove a person's embeddings and label from the index on disk."""
+    existing = _load_existing_model()
+    if existing is None:
+        print("Error: No embedding index found. Train the model first.")
+        return False
+    projection, index, label_map = existing
+
+    label = next((key for key, value in label_map.items() if value == name), None)
+    if label is None:
+        print(f"Error: {name} is not enrolled.")
+        return False
+
+    keep = index["labels"] != label
+    if not keep.any():
+        print(f"Error: Cannot remove {name}, the index would be empty.")
+        return False
+    del label_map[label]
+    try:
+        _save_with_index(projection, face_embedding.index_embeddings(index)[keep], index["labels"][keep], label_map)
     except Exception as e:
         print(f"Error saving model files: {e}")
+        return False
+    print(f"✅ {name} removed from the face index.")
+    return True
 
 if __name__ == '__main__':
     train_model() 
\ No newline at end of file